@@ -2,13 +2,20 @@
 Check that dependencies follow a set of rules.
 """
 
-import re
-from typing import List
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple, Union
 
 from ordered_set import OrderedSet
 
 from dep_check.dependency_finder import IParser
-from dep_check.models import Dependency, MatchingRules, Module, ModuleWildcard
+from dep_check.models import (
+    Dependency,
+    MatchingRule,
+    MatchingRules,
+    Module,
+    ModuleWildcard,
+)
+from dep_check.wildcard_index import WildcardIndex
 
 
 class NotAllowedDependencyException(Exception):
@@ -26,11 +33,78 @@ class NotAllowedDependencyException(Exception):
         self.authorized_modules = authorized_modules
 
 
+@dataclass(frozen=True)
+class CompiledRules:
+    """
+    Matching rules, split into forbidden and allowed ones, each side indexed
+    by specific rule wildcard.
+    """
+
+    rules: Tuple[MatchingRule, ...]
+    forbidden: Tuple[MatchingRule, ...]
+    allowed: Tuple[MatchingRule, ...]
+    forbidden_index: WildcardIndex
+    allowed_index: WildcardIndex
+
+    @property
+    def authorized_modules(self) -> List[ModuleWildcard]:
+        return [r.specific_rule_wildcard for r in self.rules]
+
+    def is_forbidden(self, module: Module) -> bool:
+        return bool(self.forbidden_index.match(module))
+
+    def find_allowed(self, module: Module) -> MatchingRules:
+        return OrderedSet(
+            [self.allowed[index] for index, _ in self.allowed_index.match(module)]
+        )
+
+
+class RuleCompiler:
+    """
+    Compile matching rules, indexing each distinct set of rules only once.
+    """
+
+    def __init__(self, parser: IParser) -> None:
+        self.parser = parser
+        self._compiled: Dict[Tuple[MatchingRule, ...], CompiledRules] = {}
+
+    def compile(self, matching_rules: Iterable[MatchingRule]) -> CompiledRules:
+        """
+        Return the compiled version of the given rules, cached by rule set.
+        """
+        rules = tuple(matching_rules)
+        if rules not in self._compiled:
+            is_forbidden = [
+                self.parser.wildcard_to_regex(r.specific_rule_wildcard).raise_if_found
+                for r in rules
+            ]
+            forbidden = tuple(r for r, f in zip(rules, is_forbidden) if f)
+            allowed = tuple(r for r, f in zip(rules, is_forbidden) if not f)
+            self._compiled[rules] = CompiledRules(
+                rules=rules,
+                forbidden=forbidden,
+                allowed=allowed,
+                forbidden_index=WildcardIndex(
+                    self.parser, (r.specific_rule_wildcard for r in forbidden)
+                ),
+                allowed_index=WildcardIndex(
+                    self.parser, (r.specific_rule_wildcard for r in allowed)
+                ),
+            )
+        return self._compiled[rules]
+
+
+def _compile_rules(
+    parser: IParser, matching_rules: Union[MatchingRules, CompiledRules]
+) -> CompiledRules:
+    if isinstance(matching_rules, CompiledRules):
+        return matching_rules
+    return RuleCompiler(parser).compile(matching_rules)
+
+
 def _raise_on_forbidden_rules(
-    parser: IParser, dependency: Dependency, matching_rules: MatchingRules
+    dependency: Dependency, matching_rules: CompiledRules
 ) -> MatchingRules:
-    # pylint: disable=too-many-nested-blocks
-    used_rules: MatchingRules = OrderedSet()
     imports = [
         dependency.main_import,
         *[
@@ -39,69 +113,54 @@ def _raise_on_forbidden_rules(
         ],
     ]
     for module in imports:
-        for matching_rule in matching_rules:
-            regex_rule = parser.wildcard_to_regex(matching_rule.specific_rule_wildcard)
-            if regex_rule.raise_if_found:
-                if re.match(f"{regex_rule.regex}$", module):
-                    raise NotAllowedDependencyException(
-                        module, [r.specific_rule_wildcard for r in matching_rules]
-                    )
-                used_rules.add(matching_rule)
-
-    return used_rules
-
-
-def _find_matching_rules(
-    parser: IParser, matching_rules: MatchingRules, dotted_import: Module
-) -> MatchingRules:
-    used_rules: MatchingRules = OrderedSet()
-
-    for matching_rule in matching_rules:
-        regex_rule = parser.wildcard_to_regex(matching_rule.specific_rule_wildcard)
-        if regex_rule.raise_if_found:
-            # Don't want to handle if here, it should have been done earlier in the flow
-            continue
-        if re.match(f"{regex_rule.regex}$", dotted_import):
-            used_rules.add(matching_rule)
+        if matching_rules.is_forbidden(module):
+            raise NotAllowedDependencyException(
+                module, matching_rules.authorized_modules
+            )
 
-    return used_rules
+    return OrderedSet(matching_rules.forbidden)
 
 
 def check_dependency(
-    parser: IParser, dependency: Dependency, matching_rules: MatchingRules
+    parser: IParser,
+    dependency: Dependency,
+    matching_rules: Union[MatchingRules, CompiledRules],
 ) -> MatchingRules:
     """
     Check that dependencies match a given set of rules.
     """
-
-    forbidden_rules = _raise_on_forbidden_rules(parser, dependency, matching_rules)
-    used_rules = _find_matching_rules(parser, matching_rules, dependency.main_import)
+    compiled_rules = _compile_rules(parser, matching_rules)
+    forbidden_rules = _raise_on_forbidden_rules(dependency, compiled_rules)
+    used_rules = compiled_rules.find_allowed(dependency.main_import)
     if used_rules:
         return OrderedSet([*used_rules, *forbidden_rules])
 
     if not dependency.sub_imports:
         raise NotAllowedDependencyException(
-            dependency.main_import, [r.specific_rule_wildcard for r in matching_rules]
+            dependency.main_import, compiled_rules.authorized_modules
         )
 
     return OrderedSet(
         [
-            *check_import_from_dependency(parser, dependency, matching_rules),
+            *check_import_from_dependency(parser, dependency, compiled_rules),
             *forbidden_rules,
         ]
     )
 
 
 def check_import_from_dependency(
-    parser: IParser, dependency: Dependency, matching_rules: MatchingRules
+    parser: IParser,
+    dependency: Dependency,
+    matching_rules: Union[MatchingRules, CompiledRules],
 ) -> MatchingRules:
+    compiled_rules = _compile_rules(parser, matching_rules)
     used_rules: MatchingRules = OrderedSet()
     for import_module in dependency.sub_imports:
         module = Module(f"{dependency.main_import}.{import_module}")
-        matched_rules = _find_matching_rules(parser, matching_rules, module)
+        matched_rules = compiled_rules.find_allowed(module)
         used_rules.update(matched_rules)
         if not matched_rules:
             raise NotAllowedDependencyException(
-                module, [r.specific_rule_wildcard for r in matching_rules]
+                module, compiled_rules.authorized_modules
             )
     return used_rules
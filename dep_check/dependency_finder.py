@@ -1,6 +1,13 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
 
-from dep_check.models import Dependencies, ModuleWildcard, RegexRule, SourceFile
+from dep_check.models import (
+    Dependencies,
+    ModuleWildcard,
+    RegexRule,
+    SourceDependencies,
+    SourceFile,
+)
 
 
 class IParser(ABC):
@@ -26,6 +33,37 @@ class IParser(ABC):
         Find the source files' from... import" dependencies
         """
 
+    def get_name(self) -> str:
+        """
+        Return the name of the parser extracting the dependencies, the same
+        for the decorators wrapping it
+        """
+        return type(self).__qualname__
+
+    def is_concurrent(self) -> bool:
+        """
+        Tell whether many source files are scanned at once, so that they are
+        better sent ahead of time
+        """
+        return False
+
+    def find_source_dependencies(self, source_file: SourceFile) -> SourceDependencies:
+        """
+        Find both views of the source files' dependencies, from a single scan
+        """
+        return SourceDependencies.from_source_file(
+            source_file, self.find_import_from_dependencies(source_file)
+        )
+
+    def iter_source_dependencies(
+        self, source_files: Iterable[SourceFile]
+    ) -> Iterator[SourceDependencies]:
+        """
+        Find the dependencies of many source files, in the same order
+        """
+        for source_file in source_files:
+            yield self.find_source_dependencies(source_file)
+
 
 def get_dependencies(source_file: SourceFile, parser: IParser) -> Dependencies:
     return parser.find_dependencies(source_file)
@@ -35,3 +73,15 @@ def get_import_from_dependencies(
     source_file: SourceFile, parser: IParser
 ) -> Dependencies:
     return parser.find_import_from_dependencies(source_file)
+
+
+def get_source_dependencies(
+    source_file: SourceFile, parser: IParser
+) -> SourceDependencies:
+    return parser.find_source_dependencies(source_file)
+
+
+def iter_source_dependencies(
+    source_files: Iterable[SourceFile], parser: IParser
+) -> Iterator[SourceDependencies]:
+    return parser.iter_source_dependencies(source_files)
@@ -0,0 +1,456 @@
+"""
+Persistent cache of the dependencies found in source files.
+"""
+
+import hashlib
+import json
+import logging
+import queue
+import sqlite3
+import time
+from collections import deque
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from ordered_set import OrderedSet
+
+from dep_check import __version__
+from dep_check.dependency_finder import IParser
+from dep_check.models import (
+    Dependencies,
+    Dependency,
+    Module,
+    ModuleWildcard,
+    RegexRule,
+    SourceDependencies,
+    SourceFile,
+)
+from dep_check.use_cases.check import DependencyError, ModuleResult
+from dep_check.use_cases.incremental_check import ICheckResultStore, ModuleResults
+from dep_check.use_cases.interfaces import Configuration
+
+# Bump when the stored format changes
+_SCHEMA_VERSION = 2
+# Number of dependencies rows written in a single (short) transaction
+_WRITE_BATCH = 100
+# Seconds to wait for another dep_check run to release the database
+_BUSY_TIMEOUT = 30
+# Seconds after which the check results of a key no longer updated are pruned
+_CHECK_RESULTS_LIFETIME = 30 * 24 * 3600
+# Number of source files looked up ahead of the first one still being scanned,
+# by a concurrent parser
+_LOOKAHEAD = 1000
+
+_PendingFile = Tuple[SourceFile, Optional[Dependencies]]
+
+
+def _get_raw_content(source_file: SourceFile) -> bytes:
+    if isinstance(source_file.content, str):
+        return source_file.content.encode("utf-8", "surrogatepass")
+    return source_file.content
+
+
+def _hash(content: bytes) -> bytes:
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def _dump(dependencies: Dependencies) -> str:
+    return json.dumps(
+        [[d.main_import, sorted(d.sub_imports)] for d in dependencies],
+        separators=(",", ":"),
+    )
+
+
+def _load(data: str) -> Dependencies:
+    return OrderedSet(
+        [
+            Dependency(Module(main_import), frozenset(map(Module, sub_imports)))
+            for main_import, sub_imports in json.loads(data)
+        ]
+    )
+
+
+class DependencyCache:
+    """
+    SQLite storage of the source files' dependencies, keyed by parser and module,
+    and checked against the size and hash of the source code.
+
+    The whole cache is dropped when dep_check version changes.
+
+    The database is shared by parallel runs: it is opened in WAL mode, and rows
+    are written by batches, in short transactions without any parsing. If it
+    stays locked anyway, or cannot be opened, the cache is disabled for the
+    rest of the run.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        self._version = f"{__version__}:{_SCHEMA_VERSION}"
+        self._pending_rows: List[Tuple[str, str, int, bytes, str]] = []
+        self._connection: Optional[sqlite3.Connection] = None
+        try:
+            self._connection = self._open(cache_dir)
+            self._initialize(self._connection)
+        except (sqlite3.DatabaseError, OSError) as error:
+            self._disable(error)
+
+    @staticmethod
+    def _open(cache_dir: Path) -> sqlite3.Connection:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        gitignore = cache_dir / ".gitignore"
+        if not gitignore.exists():
+            gitignore.write_text("*\n", encoding="utf-8")
+        return sqlite3.connect(
+            str(cache_dir / "dependencies.sqlite"), timeout=_BUSY_TIMEOUT
+        )
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS dependencies ("
+            " parser TEXT NOT NULL, module TEXT NOT NULL, size INTEGER NOT NULL,"
+            " hash BLOB NOT NULL, dependencies TEXT NOT NULL,"
+            " PRIMARY KEY (parser, module));"
+            "CREATE TABLE IF NOT EXISTS check_results ("
+            " key TEXT NOT NULL, module TEXT NOT NULL, result TEXT NOT NULL,"
+            " PRIMARY KEY (key, module));"
+        )
+        row = connection.execute(
+            "SELECT value FROM metadata WHERE key = 'version'"
+        ).fetchone()
+        if row is None or row[0] != self._version:
+            with connection:
+                connection.execute("DELETE FROM dependencies")
+                connection.execute("DELETE FROM check_results")
+                connection.execute(
+                    "DELETE FROM metadata WHERE key LIKE 'check:%' OR key LIKE 'used:%'"
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO metadata VALUES ('version', ?)",
+                    (self._version,),
+                )
+
+    def _disable(self, error: Exception) -> None:
+        """
+        Stop using the cache for the rest of the run, source files are parsed.
+        """
+        logging.warning("Dependencies cache disabled: %s", error)
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+        self._pending_rows = []
+
+    def _fetch(self, query: str, parameters: Tuple[str, ...]) -> List[Any]:
+        """
+        Run a read query, without rows once the cache is disabled.
+        """
+        rows: List[Any] = []
+        if self._connection is not None:
+            try:
+                rows = self._connection.execute(query, parameters).fetchall()
+            except sqlite3.DatabaseError as error:
+                self._disable(error)
+        return rows
+
+    def _write(self, *statements: Tuple[str, Iterable[Tuple[Any, ...]]]) -> None:
+        """
+        Run write statements, each over many rows, in a single transaction.
+        """
+        if self._connection is None:
+            return
+        try:
+            with self._connection:
+                for query, rows in statements:
+                    self._connection.executemany(query, rows)
+        except sqlite3.DatabaseError as error:
+            self._disable(error)
+
+    def _flush(self) -> None:
+        rows, self._pending_rows = self._pending_rows, []
+        if rows:
+            self._write(
+                ("INSERT OR REPLACE INTO dependencies VALUES (?, ?, ?, ?, ?)", rows)
+            )
+
+    def get(self, parser_name: str, source_file: SourceFile) -> Optional[Dependencies]:
+        """
+        Return the cached dependencies of a source file, None if it has changed.
+        """
+        rows = self._fetch(
+            "SELECT size, hash, dependencies FROM dependencies"
+            " WHERE parser = ? AND module = ?",
+            (parser_name, source_file.module),
+        )
+        content = _get_raw_content(source_file)
+        if not rows or rows[0][0] != len(content) or rows[0][1] != _hash(content):
+            return None
+        return _load(rows[0][2])
+
+    def set(
+        self, parser_name: str, source_file: SourceFile, dependencies: Dependencies
+    ) -> None:
+        """
+        Store the dependencies of a source file, once a batch of them is ready.
+        """
+        if self._connection is None:
+            return
+        content = _get_raw_content(source_file)
+        self._pending_rows.append(
+            (
+                parser_name,
+                source_file.module,
+                len(content),
+                _hash(content),
+                _dump(dependencies),
+            )
+        )
+        if len(self._pending_rows) >= _WRITE_BATCH:
+            self._flush()
+
+    def get_check_results(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Return the stored result of each module for a check key, None if no
+        complete check was stored for this key.
+        """
+        if not self._fetch("SELECT 1 FROM metadata WHERE key = ?", (f"check:{key}",)):
+            return None
+        return dict(
+            self._fetch(
+                "SELECT module, result FROM check_results WHERE key = ?", (key,)
+            )
+        )
+
+    def clear_check_results(self, key: str) -> None:
+        """
+        Forget the stored results of a check key.
+        """
+        self._write(
+            ("DELETE FROM check_results WHERE key = ?", [(key,)]),
+            ("DELETE FROM metadata WHERE key = 'check:' || ?", [(key,)]),
+        )
+
+    def prune_check_results(self) -> None:
+        """
+        Forget the stored results of the check keys no longer updated, e.g. for
+        previous dependency rules.
+        """
+        kept_keys = (
+            "SELECT substr(key, 6) FROM metadata"
+            " WHERE key LIKE 'used:%' AND CAST(value AS REAL) >= ?"
+        )
+        expiry = time.time() - _CHECK_RESULTS_LIFETIME
+        self._write(
+            (f"DELETE FROM check_results WHERE key NOT IN ({kept_keys})", [(expiry,)]),
+            (
+                "DELETE FROM metadata WHERE key LIKE 'check:%'"
+                f" AND substr(key, 7) NOT IN ({kept_keys})",
+                [(expiry,)],
+            ),
+            (
+                "DELETE FROM metadata WHERE key LIKE 'used:%'"
+                " AND CAST(value AS REAL) < ?",
+                [(expiry,)],
+            ),
+        )
+
+    def set_check_results(
+        self, key: str, results: Dict[str, str], removed_modules: Iterable[str]
+    ) -> None:
+        """
+        Store the result of each module for a check key, and forget the
+        removed modules.
+        """
+        self._write(
+            (
+                "DELETE FROM check_results WHERE key = ? AND module = ?",
+                [(key, module) for module in removed_modules],
+            ),
+            (
+                "INSERT OR REPLACE INTO check_results VALUES (?, ?, ?)",
+                [(key, module, result) for module, result in results.items()],
+            ),
+            (
+                "INSERT OR REPLACE INTO metadata VALUES ('used:' || ?, ?)",
+                [(key, str(time.time()))],
+            ),
+        )
+
+    def complete_check_results(self, key: str) -> None:
+        """
+        Mark the stored results of a check key as complete, so that they are
+        read back.
+        """
+        self._write(
+            ("INSERT OR REPLACE INTO metadata VALUES (?, '')", [(f"check:{key}",)])
+        )
+
+    def close(self) -> None:
+        self._flush()
+        if self._connection is not None:
+            self._connection.close()
+
+    def __enter__(self) -> "DependencyCache":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class CachedParser(IParser):
+    """
+    Parser decorator, only scanning the source files missing from a cache.
+    """
+
+    def __init__(self, parser: IParser, cache: DependencyCache) -> None:
+        self.parser = parser
+        self.cache = cache
+        self._parser_name = parser.get_name()
+
+    def get_name(self) -> str:
+        return self._parser_name
+
+    def is_concurrent(self) -> bool:
+        return self.parser.is_concurrent()
+
+    def wildcard_to_regex(self, module: ModuleWildcard) -> RegexRule:
+        return self.parser.wildcard_to_regex(module)
+
+    def find_dependencies(self, source_file: SourceFile) -> Dependencies:
+        return self.find_source_dependencies(source_file).dependencies
+
+    def find_import_from_dependencies(self, source_file: SourceFile) -> Dependencies:
+        return self.find_source_dependencies(source_file).import_from_dependencies
+
+    def find_source_dependencies(self, source_file: SourceFile) -> SourceDependencies:
+        dependencies = self.cache.get(self._parser_name, source_file)
+        if dependencies is None:
+            dependencies = self.parser.find_import_from_dependencies(source_file)
+            self.cache.set(self._parser_name, source_file, dependencies)
+        return SourceDependencies.from_source_file(source_file, dependencies)
+
+    def _drain(
+        self,
+        pending: Deque[_PendingFile],
+        scanned: Iterator[SourceDependencies],
+        lookahead: int,
+    ) -> List[SourceDependencies]:
+        """
+        Pop the pending source files which are ready, or too far behind.
+        """
+        drained = []
+        while pending and (pending[0][1] is not None or len(pending) > lookahead):
+            source_file, dependencies = pending.popleft()
+            if dependencies is None:
+                dependencies = next(scanned).import_from_dependencies
+                self.cache.set(self._parser_name, source_file, dependencies)
+            drained.append(
+                SourceDependencies.from_source_file(source_file, dependencies)
+            )
+        return drained
+
+    def iter_source_dependencies(
+        self, source_files: Iterable[SourceFile]
+    ) -> Iterator[SourceDependencies]:
+        """
+        Look up the cache for each source file, and send the missing ones to
+        the wrapped parser as a single stream, so that it can scan them
+        concurrently. Dependencies are yielded in the source files order.
+
+        A sequential parser scans each missing source file right away instead,
+        so that dependencies are still yielded as soon as they are found.
+        """
+        if not self.parser.is_concurrent():
+            yield from super().iter_source_dependencies(source_files)
+            return
+        misses: "queue.SimpleQueue[Optional[SourceFile]]" = queue.SimpleQueue()
+        scanned = self.parser.iter_source_dependencies(iter(misses.get, None))
+        pending: Deque[_PendingFile] = deque()
+        try:
+            for source_file in source_files:
+                dependencies = self.cache.get(self._parser_name, source_file)
+                if dependencies is None:
+                    misses.put(source_file)
+                pending.append((source_file, dependencies))
+                yield from self._drain(pending, scanned, _LOOKAHEAD)
+            misses.put(None)
+            yield from self._drain(pending, scanned, 0)
+        finally:
+            # Let the wrapped parser finish, even if we stopped early
+            misses.put(None)
+
+
+def _dump_result(result: ModuleResult) -> str:
+    return json.dumps(
+        {
+            "errors": [[e.dependency, list(e.rules)] for e in result.errors],
+            "used_rules": [list(rule) for rule in result.used_rules],
+            "path": result.path,
+        },
+        separators=(",", ":"),
+    )
+
+
+def _load_result(module: Module, data: str) -> ModuleResult:
+    result = json.loads(data)
+    path = result.get("path")
+    return ModuleResult(
+        errors=tuple(
+            DependencyError(
+                module, Module(dependency), tuple(map(ModuleWildcard, rules)), path
+            )
+            for dependency, rules in result["errors"]
+        ),
+        used_rules=tuple(
+            (ModuleWildcard(wildcard), ModuleWildcard(rule))
+            for wildcard, rule in result["used_rules"]
+        ),
+        path=path,
+    )
+
+
+class CheckResultStore(ICheckResultStore):
+    """
+    Store the check result of each module in the dependencies cache.
+
+    Results are only read back for the same dependency rules and scope (the
+    parser, checked source dirs...): any change leads to a full check.
+    """
+
+    def __init__(
+        self, cache: DependencyCache, configuration: Configuration, scope: List[str]
+    ) -> None:
+        self.cache = cache
+        self.key = hashlib.blake2b(
+            json.dumps([configuration.dependency_rules, scope]).encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+
+    def read(self) -> Optional[ModuleResults]:
+        results = self.cache.get_check_results(self.key)
+        if results is None:
+            return None
+        return {
+            Module(module): _load_result(Module(module), result)
+            for module, result in results.items()
+        }
+
+    def clear(self) -> None:
+        self.cache.clear_check_results(self.key)
+        self.cache.prune_check_results()
+
+    def update(self, results: ModuleResults, removed_modules: Iterable[Module]) -> None:
+        self.cache.set_check_results(
+            self.key,
+            {m: _dump_result(r) for m, r in results.items()},
+            removed_modules,
+        )
+
+    def complete(self) -> None:
+        self.cache.complete_check_results(self.key)
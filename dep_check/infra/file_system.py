@@ -2,11 +2,18 @@
 Implementation of configuration reader and writer
 """
 
+import fnmatch
 import inspect
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Iterator
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
 
-from dep_check.models import Module, SourceCode, SourceFile
+from dep_check.models import ChangedSourceFiles, Module, SourceFile
 
 
 def _get_python_module(path: Path) -> Module:
@@ -21,6 +28,10 @@ def _get_python_module(path: Path) -> Module:
     if not name:
         raise ModuleNotFoundError("Cannot find module name", path=str(path))
 
+    return _join_module(path, name)
+
+
+def _join_module(path: Path, name: str) -> Module:
     full_path = list(p.name for p in path.parents[:-1])
     full_path.reverse()
     full_path.append(name)
@@ -30,25 +41,454 @@ def _get_python_module(path: Path) -> Module:
     return Module(module)
 
 
-def _read_file(module_path: Path) -> SourceFile:
-    with open(str(module_path), "r", encoding="utf-8") as stream:
+def _read_file(module_path: Path, module: Optional[Module] = None) -> SourceFile:
+    """
+    Read a source file as bytes, decoded later if needed. The file is closed
+    once read, however long the source file is kept.
+    """
+    with open(str(module_path), "rb") as stream:
         content = stream.read()
     return SourceFile(
-        Module(_get_python_module(module_path)),
-        SourceCode(content),
+        module or Module(_get_python_module(module_path)), content, str(module_path)
     )
 
 
-def source_file_iterator(
-    files_path: list[Path], root_path: Path
-) -> Iterator[SourceFile]:
+class ExcludePatterns:
     """
-    Iterator of all python source files in a directory.
+    Glob patterns of paths to exclude from the source files discovery.
+
+    A pattern ending with `/` only matches directories. A pattern containing
+    another `/` matches the path relative to the project root, otherwise it
+    matches the file or directory name. E.g. `.venv`, `build/`, `docs/*.py`.
     """
+
+    def __init__(self, patterns: Iterable[str] = ()) -> None:
+        by_kind: Dict[Tuple[bool, bool], List[str]] = {}
+        for pattern in patterns:
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            on_path = "/" in pattern
+            by_kind.setdefault((on_path, dir_only), []).append(
+                fnmatch.translate(pattern.lstrip("/"))
+            )
+        # One regex per kind of pattern: (on path, only for directories)
+        self._regexes = {
+            kind: re.compile("|".join(regexes)) for kind, regexes in by_kind.items()
+        }
+
+    def __bool__(self) -> bool:
+        return bool(self._regexes)
+
+    def is_excluded(self, path: str, name: str, is_dir: bool) -> bool:
+        """
+        Whether a path, relative to the project root, must be excluded.
+        """
+        return any(
+            regex.match(path if on_path else name)
+            for (on_path, dir_only), regex in self._regexes.items()
+            if is_dir or not dir_only
+        )
+
+
+# Directories excluded by default, of version control, virtualenvs and tools:
+# only unambiguous names, not those of possible packages (e.g. build, dist)
+DEFAULT_EXCLUDES = (
+    ".bzr/",
+    ".direnv/",
+    ".eggs/",
+    ".git/",
+    ".hg/",
+    ".mypy_cache/",
+    ".nox/",
+    ".pytest_cache/",
+    ".svn/",
+    ".tox/",
+    ".venv/",
+    "__pycache__/",
+    "__pypackages__/",
+    "buck-out/",
+    "node_modules/",
+)
+
+
+# Wildcards, character classes and escaped characters of gitignore patterns
+_GITIGNORE_TOKENS = re.compile(r"(\*\*/|/\*\*$|\*+|\?|\[!?\]?[^\]]*\]|\\.)")
+_GITIGNORE_WILDCARDS = {"**/": "(?:.*/)?", "/**": "/.*", "?": "[^/]"}
+
+
+def _translate_gitignore(pattern: str) -> str:
+    """
+    Translate a gitignore pattern to a regex, where wildcards do not match `/`
+    but `**` matches any number of directories.
+    """
+    parts = []
+    for token in _GITIGNORE_TOKENS.split(pattern):
+        if token in _GITIGNORE_WILDCARDS:
+            parts.append(_GITIGNORE_WILDCARDS[token])
+        elif token.startswith("*"):
+            parts.append("[^/]*")
+        elif token.startswith("[") and token.endswith("]") and len(token) > 2:
+            chars = token[1:-1].replace("\\", "\\\\")
+            parts.append(f"[^{chars[1:]}]" if chars[0] == "!" else f"[{chars}]")
+        else:
+            parts.append(re.escape(token[1:] if token[:1] == "\\" else token))
+    return "".join(parts)
+
+
+class GitIgnore:
+    """
+    Patterns of a `.gitignore` file, matching the paths under its directory.
+
+    As with git, the last matching pattern wins, and a pattern starting with
+    `!` includes back the paths excluded by a previous one.
+    """
+
+    def __init__(self, base: str, lines: Iterable[str]) -> None:
+        self.base = base
+        # (regex, matches the relative path or only the name, only for dirs, negated)
+        self._rules: List[Tuple[Pattern[str], bool, bool, bool]] = []
+        for line in lines:
+            pattern = line.rstrip("\n")
+            if not pattern.endswith("\\ "):
+                pattern = pattern.rstrip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            negated = pattern.startswith("!")
+            pattern = pattern[1:] if negated else pattern
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            on_path = "/" in pattern
+            regex = re.compile(_translate_gitignore(pattern.lstrip("/")))
+            self._rules.append((regex, on_path, dir_only, negated))
+
+    @classmethod
+    def read(cls, directory: str) -> Optional["GitIgnore"]:
+        """
+        Read the `.gitignore` file of a directory, relative to the project root.
+        """
+        try:
+            with open(
+                os.path.join(directory, ".gitignore"), "r", encoding="utf-8"
+            ) as stream:
+                lines = stream.readlines()
+        except OSError:
+            return None
+        return cls("" if directory == "." else directory, lines)
+
+    def match(self, path: str, name: str, is_dir: bool) -> Optional[bool]:
+        """
+        Whether a path, relative to the project root, is ignored, or None if
+        no pattern matches it.
+        """
+        relative = path[len(self.base) + 1 :] if self.base else path
+        for regex, on_path, dir_only, negated in reversed(self._rules):
+            if (is_dir or not dir_only) and regex.fullmatch(
+                relative if on_path else name
+            ):
+                return not negated
+        return None
+
+
+_GitIgnores = Tuple[GitIgnore, ...]
+_Listing = Tuple[List[str], List[str], _GitIgnores]
+
+
+def _is_git_ignored(
+    gitignores: _GitIgnores, path: str, name: str, is_dir: bool
+) -> bool:
+    # The deepest .gitignore file matching the path wins
+    for gitignore in reversed(gitignores):
+        ignored = gitignore.match(path, name, is_dir)
+        if ignored is not None:
+            return ignored
+    return False
+
+
+class _DirectoryWalker:
+    """
+    Walk directories with os.scandir, in a deterministic order.
+
+    The content of each directory is listed once, using the file types given
+    by scandir, and excluded or git ignored directories are never entered.
+    With a thread pool, sub-directories are listed ahead, while the current
+    one is being walked.
+    """
+
+    def __init__(
+        self,
+        exclude: ExcludePatterns,
+        gitignore: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.exclude = exclude
+        self.gitignore = gitignore
+        self.executor = executor
+
+    def _is_excluded(
+        self, entry: "os.DirEntry[str]", is_dir: bool, gitignores: _GitIgnores
+    ) -> bool:
+        path = entry.path[2:] if entry.path.startswith("./") else entry.path
+        return bool(
+            self.exclude and self.exclude.is_excluded(path, entry.name, is_dir)
+        ) or _is_git_ignored(gitignores, path, entry.name, is_dir)
+
+    def _list(self, directory: str, gitignores: _GitIgnores) -> _Listing:
+        if self.gitignore:
+            gitignore = GitIgnore.read(directory)
+            gitignores = gitignores if gitignore is None else (*gitignores, gitignore)
+        files, directories = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                # Symlinked directories are not walked, they may loop
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if self._is_excluded(entry, is_dir, gitignores):
+                    continue
+                if is_dir:
+                    directories.append(entry.name)
+                elif entry.name.endswith(".py") and entry.is_file():
+                    files.append(entry.name)
+        return sorted(files), sorted(directories), gitignores
+
+    def _submit(self, directory: Path, gitignores: _GitIgnores) -> "Future[_Listing]":
+        if self.executor is not None:
+            return self.executor.submit(self._list, str(directory), gitignores)
+        listing: "Future[_Listing]" = Future()
+        listing.set_result(self._list(str(directory), gitignores))
+        return listing
+
+    def _walk(
+        self, directory: Path, package: List[str], listing: "Future[_Listing]"
+    ) -> Iterator[Tuple[Path, Module]]:
+        files, directories, gitignores = listing.result()
+        sub_listings = [
+            self._submit(directory / name, gitignores) for name in directories
+        ]
+        for name in files:
+            yield directory / name, Module(".".join([*package, name[:-3]]))
+        for name, sub_listing in zip(directories, sub_listings):
+            yield from self._walk(directory / name, [*package, name], sub_listing)
+
+    def walk(self, directory: Path) -> Iterator[Tuple[Path, Module]]:
+        """
+        Iterate over the python files of a directory, with their module.
+        """
+        gitignores: _GitIgnores = ()
+        if self.gitignore:
+            # .gitignore files of the parent directories, from the project root
+            gitignores = tuple(
+                gitignore
+                for parent in reversed(directory.parents)
+                if (gitignore := GitIgnore.read(str(parent))) is not None
+            )
+        package = [part for part in directory.parts if part != "."]
+        return self._walk(directory, package, self._submit(directory, gitignores))
+
+
+def _iter_source_files(
+    walker: _DirectoryWalker, files_path: list[Path], root_path: Path
+) -> Iterator[SourceFile]:
     for file_path in files_path:
         module_path = file_path.absolute().relative_to(root_path)
         if module_path.is_file():
             yield _read_file(module_path)
             continue
-        for submodule_path in module_path.rglob("*.py"):
-            yield _read_file(submodule_path)
+        for submodule_path, module in walker.walk(module_path):
+            yield _read_file(submodule_path, module)
+
+
+def source_file_iterator(
+    files_path: list[Path],
+    root_path: Path,
+    exclude: Optional[ExcludePatterns] = None,
+    gitignore: bool = False,
+    threads: int = 1,
+) -> Iterator[SourceFile]:
+    """
+    Iterator of all python source files in a directory, but the excluded ones
+    (and the ones ignored by git, following the `.gitignore` files).
+
+    Source files given explicitly are never excluded. With many threads,
+    directories are listed concurrently (e.g. on network file systems).
+    """
+    with ThreadPoolExecutor(threads) if threads > 1 else nullcontext() as executor:
+        walker = _DirectoryWalker(exclude or ExcludePatterns(), gitignore, executor)
+        yield from _iter_source_files(walker, files_path, root_path)
+
+
+class GitListingError(Exception):
+    """
+    Error raised when the source files cannot be listed by git.
+    """
+
+
+def _is_path_excluded(exclude: ExcludePatterns, path: str) -> bool:
+    """
+    Whether a file path, or one of its parent directories, must be excluded.
+    """
+    parts = path.split("/")
+    return any(
+        exclude.is_excluded("/".join(parts[: i + 1]), part, i + 1 < len(parts))
+        for i, part in enumerate(parts)
+    )
+
+
+def _is_path_git_ignored(path: str) -> bool:
+    """
+    Whether a file path, or one of its parent directories, is ignored by the
+    `.gitignore` files from the project root down to it.
+    """
+    parts = path.split("/")
+    gitignores: _GitIgnores = ()
+    for i, part in enumerate(parts):
+        gitignore = GitIgnore.read("/".join(parts[:i]) or ".")
+        gitignores = gitignores if gitignore is None else (*gitignores, gitignore)
+        if _is_git_ignored(
+            gitignores, "/".join(parts[: i + 1]), part, i + 1 < len(parts)
+        ):
+            return True
+    return False
+
+
+def _walk_order(path: str) -> Tuple[Tuple[bool, str], ...]:
+    """
+    Sort key of a file path, listing the files of a directory before its
+    sub-directories, as when walking them.
+    """
+    *directories, name = path.split("/")
+    return (*((True, directory) for directory in directories), (False, name))
+
+
+def _get_pathspec_index(pathspecs: List[str], path: str) -> int:
+    """
+    Index of the first pathspec (a directory or a file) listing a file path.
+    """
+    return next(
+        (
+            index
+            for index, pathspec in enumerate(pathspecs)
+            if pathspec in (".", path) or path.startswith(f"{pathspec}/")
+        ),
+        len(pathspecs),
+    )
+
+
+def _git_ls_files(pathspecs: List[str], root_path: Path, untracked: bool) -> str:
+    command = ["git", "ls-files", "-z", "--cached"]
+    if untracked:
+        command += ["--others", "--exclude-standard"]
+    try:
+        output = subprocess.run(
+            [*command, "--", *pathspecs],
+            cwd=root_path,
+            check=True,
+            capture_output=True,
+        ).stdout
+    except OSError as error:
+        raise GitListingError(f"Cannot run git: {error}") from error
+    except subprocess.CalledProcessError as error:
+        raise GitListingError(os.fsdecode(error.stderr).strip()) from error
+    return os.fsdecode(output)
+
+
+def git_source_file_iterator(
+    files_path: list[Path],
+    root_path: Path,
+    exclude: Optional[ExcludePatterns] = None,
+    untracked: bool = False,
+) -> Iterator[SourceFile]:
+    """
+    Iterator of all python source files in a directory known to git, but the
+    excluded ones, in the same order as `source_file_iterator`.
+
+    Files are listed from the git index, with `git ls-files`, instead of
+    walking the directories, then sorted for each given path in turn (once, for
+    the first path listing them). With untracked, the untracked files which
+    are not ignored by git are listed too.
+    """
+    pathspecs = [
+        file_path.absolute().relative_to(root_path).as_posix()
+        for file_path in files_path
+    ]
+    # Source files given explicitly are never excluded
+    paths = {
+        path
+        for path in _git_ls_files(pathspecs, root_path, untracked).split("\0")
+        if path.endswith(".py")
+        and (path in pathspecs or not (exclude and _is_path_excluded(exclude, path)))
+    }
+    for path in sorted(
+        paths,
+        key=lambda path: (_get_pathspec_index(pathspecs, path), _walk_order(path)),
+    ):
+        module_path = Path(path)
+        # Deleted files are still listed, until their removal is staged
+        if module_path.is_file():
+            yield _read_file(
+                module_path,
+                Module(".".join([*module_path.parts[:-1], module_path.stem])),
+            )
+
+
+def read_changed_paths(changed_files: List[str]) -> List[Path]:
+    """
+    Paths of the changed files, read from stdin (one per line) for `-`,
+    e.g. the output of `git diff --name-only`.
+    """
+    if changed_files == ["-"]:
+        changed_files = [line.strip() for line in sys.stdin if line.strip()]
+    return [Path(changed_file) for changed_file in changed_files]
+
+
+def _is_changed_path_skipped(
+    module_path: Path, exclude: Optional[ExcludePatterns], gitignore: bool
+) -> bool:
+    """
+    Whether a changed file, relative to the project root, is skipped when
+    walking the source dirs: excluded, or ignored by git.
+    """
+    path = module_path.as_posix()
+    return bool(exclude and _is_path_excluded(exclude, path)) or (
+        gitignore and _is_path_git_ignored(path)
+    )
+
+
+def changed_source_files(
+    changed_paths: List[Path],
+    files_path: List[Path],
+    root_path: Path,
+    exclude: Optional[ExcludePatterns] = None,
+    gitignore: bool = False,
+) -> ChangedSourceFiles:
+    """
+    The python source files among the changed files, under the given source
+    dirs or files. Missing ones are reported as removed modules.
+
+    As when walking the source dirs, excluded files (and the ones ignored by
+    git) are skipped, unless given explicitly.
+    """
+    sources_path = [file_path.absolute() for file_path in files_path]
+    module_paths = []
+    for changed_path in changed_paths:
+        absolute_path = changed_path.absolute()
+        if changed_path.suffix != ".py" or not any(
+            absolute_path.is_relative_to(source_path) for source_path in sources_path
+        ):
+            continue
+        module_path = absolute_path.relative_to(root_path)
+        # Source files given explicitly are never skipped
+        if absolute_path in sources_path or not _is_changed_path_skipped(
+            module_path, exclude, gitignore
+        ):
+            module_paths.append(module_path)
+    return ChangedSourceFiles(
+        source_files=(
+            _read_file(module_path)
+            for module_path in module_paths
+            if module_path.is_file()
+        ),
+        removed_modules=[
+            _join_module(module_path, module_path.stem)
+            for module_path in module_paths
+            if not module_path.is_file()
+        ],
+    )
@@ -2,19 +2,35 @@
 Implementations of IDependenciesPrinter
 """
 
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
 from dataclasses import asdict, dataclass
 from enum import Enum
+from io import TextIOWrapper
 from pathlib import Path
-from subprocess import check_output
+from subprocess import DEVNULL, PIPE, Popen, TimeoutExpired
 from sys import stdin, stdout
-from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
 
 import yaml
 from jinja2 import Template
 
-from dep_check.models import GlobalDependencies, Module, Rules, iter_all_modules
+from dep_check.models import GlobalDependencies, Module, Rule, Rules, iter_all_modules
 from dep_check.use_cases.build import IConfigurationWriter
-from dep_check.use_cases.check import DependencyError, IReportPrinter
+from dep_check.use_cases.check import DependencyError, IReporter, IReportPrinter
 from dep_check.use_cases.draw_graph import IGraphDrawer
 from dep_check.use_cases.interfaces import Configuration, UnusedLevel
 
@@ -54,59 +70,67 @@ class YamlConfigurationIO(IConfigurationWriter):
             return Configuration(**yaml.safe_load(stream))
 
 
+_IMPORT_ERRORS_HEADER = (
+    "\n\n"
+    + Format.BOLD.value
+    + Format.FAIL.value
+    + "IMPORT ERRORS".center(30)
+    + Format.ENDC.value
+)
+
+
+def _log_module_errors(module: Module, errors: List[DependencyError]) -> Iterator[str]:
+    """
+    Log dependency errors of a single module.
+    """
+    yield "\nModule " + Format.BOLD.value + module + Format.ENDC.value + ":"
+    yield " \u2022 " + Format.FAIL.value + "Unauthorized modules:" + Format.ENDC.value
+
+    for error in errors:
+        yield f"\t- {error.dependency}"
+    yield "\n \u2022 " + Format.INFO.value + "Rules:" + Format.ENDC.value
+
+    for rule in errors[0].rules:
+        yield f"\t- {rule}"
+
+
 class ReportPrinter(IReportPrinter):
     """
     Print the report after checking the files
     """
 
-    def __init__(self, configuration: Configuration) -> None:
+    def __init__(
+        self, configuration: Configuration, stream: Optional[TextIO] = None
+    ) -> None:
         self.configuration = configuration
+        # None for the current sys.stdout
+        self.stream = stream
 
     @staticmethod
-    def _log_dep_errors(dep_errors: List[DependencyError]) -> None:
+    def _log_dep_errors(dep_errors: List[DependencyError]) -> Iterator[str]:
         """
-        Log dependency errors.
+        Log dependency errors, grouped by module.
         """
         if not dep_errors:
             return
 
-        print(
-            "\n\n"
-            + Format.BOLD.value
-            + Format.FAIL.value
-            + "IMPORT ERRORS".center(30)
-            + Format.ENDC.value
-        )
+        yield _IMPORT_ERRORS_HEADER
 
-        module_errors = {
-            error.module: [e for e in dep_errors if e.module == error.module]
-            for error in dep_errors
-        }
+        module_errors: Dict[Module, List[DependencyError]] = {}
+        for error in dep_errors:
+            module_errors.setdefault(error.module, []).append(error)
         for module, errors in sorted(module_errors.items()):
-            print("\nModule " + Format.BOLD.value + module + Format.ENDC.value + ":")
-            print(
-                " \u2022 "
-                + Format.FAIL.value
-                + "Unauthorized modules:"
-                + Format.ENDC.value
-            )
-
-            for error in errors:
-                print(f"\t- {error.dependency}")
-            print("\n \u2022 " + Format.INFO.value + "Rules:" + Format.ENDC.value)
-
-            for rule in errors[0].rules:
-                print(f"\t- {rule}")
+            yield from _log_module_errors(module, errors)
 
     @staticmethod
-    def _log_unused(unused_rules: Rules, level: Format) -> None:
+    def _log_unused(unused_rules: Rules, level: Format) -> Iterator[str]:
         """
         Log warnings
         """
         if not unused_rules:
             return
 
-        print(
+        yield (
             "\n\n"
             + Format.BOLD.value
             + level.value
@@ -116,40 +140,35 @@ class ReportPrinter(IReportPrinter):
         previous_wildcard = ""
         for wildcard, rule in sorted(unused_rules):
             if wildcard != previous_wildcard:
-                print(
+                yield (
                     "\nWildcard "
                     + Format.BOLD.value
                     + wildcard
                     + Format.ENDC.value
                     + ":"
                 )
-                print(" \u2022 " + level.value + "Unused rules:" + Format.ENDC.value)
+                yield " \u2022 " + level.value + "Unused rules:" + Format.ENDC.value
                 previous_wildcard = wildcard
-            print(f"\t- {wildcard}: {rule}")
+            yield f"\t- {wildcard}: {rule}"
 
-    def print_report(
-        self, errors: List[DependencyError], unused_rules: Rules, nb_files: int
-    ) -> None:
+    def _log_summary(
+        self, nb_dep_errors: int, unused_rules: Rules, nb_files: int
+    ) -> Iterator[str]:
         """
-        Print report
+        Log unused rules, and the number of errors and warnings
         """
-        nb_errors = 0
+        nb_errors = nb_dep_errors
         nb_warnings = 0
-        self._log_dep_errors(errors)
-        nb_errors += len(errors)
-
         if self.configuration.unused_level == UnusedLevel.ERROR.value:
-            self._log_unused(unused_rules, Format.FAIL)
+            yield from self._log_unused(unused_rules, Format.FAIL)
             nb_errors += len(unused_rules)
         elif self.configuration.unused_level == UnusedLevel.WARNING.value:
-            self._log_unused(unused_rules, Format.WARNING)
+            yield from self._log_unused(unused_rules, Format.WARNING)
             nb_warnings += len(unused_rules)
 
         if nb_errors == 0 and nb_warnings == 0:
-            print(
-                Format.SUCCESS.value + "\nEverything is in order! " + Format.ENDC.value
-            )
-        print(
+            yield Format.SUCCESS.value + "\nEverything is in order! " + Format.ENDC.value
+        yield (
             "\n * "
             + Format.FAIL.value
             + f"{nb_errors} errors"
@@ -161,6 +180,54 @@ class ReportPrinter(IReportPrinter):
             + f" in {nb_files} files."
         )
 
+    def print_report(
+        self, errors: List[DependencyError], unused_rules: Rules, nb_files: int
+    ) -> None:
+        """
+        Print report, in a single write
+        """
+        lines = list(self._log_dep_errors(errors))
+        lines.extend(self._log_summary(len(errors), unused_rules, nb_files))
+        print("\n".join(lines), file=self.stream)
+
+
+class StreamReportPrinter(ReportPrinter, IReporter):
+    """
+    Print the errors of each module as soon as it is checked, in the order of
+    the source files, then the unused rules once all are checked.
+
+    Only the errors of the module being checked are held in memory.
+    """
+
+    def __init__(
+        self, configuration: Configuration, stream: Optional[TextIO] = None
+    ) -> None:
+        super().__init__(configuration, stream)
+        self._module_errors: List[DependencyError] = []
+        self._nb_errors = 0
+
+    def begin(self) -> None:
+        self._module_errors = []
+        self._nb_errors = 0
+
+    def on_error(self, error: DependencyError) -> None:
+        self._module_errors.append(error)
+
+    def on_file_done(
+        self, module: Module, used_rules: Tuple[Rule, ...], path: Optional[str] = None
+    ) -> None:
+        if not self._module_errors:
+            return
+        lines = [] if self._nb_errors else [_IMPORT_ERRORS_HEADER]
+        lines.extend(_log_module_errors(module, self._module_errors))
+        print("\n".join(lines), file=self.stream, flush=True)
+        self._nb_errors += len(self._module_errors)
+        self._module_errors = []
+
+    def end(self, unused_rules: Rules, nb_files: int) -> None:
+        lines = self._log_summary(self._nb_errors, unused_rules, nb_files)
+        print("\n".join(lines), file=self.stream)
+
 
 def read_graph_config(conf_path: str) -> Dict:
     """
@@ -170,35 +237,80 @@ def read_graph_config(conf_path: str) -> Dict:
         return yaml.safe_load(stream)
 
 
+class GraphRenderError(Exception):
+    """
+    Error raised when graphviz fails to render the dependency graph.
+    """
+
+
 @dataclass(init=False)
 class Graph:
     """
     Dataclass representing the information to draw a graph
     """
 
-    def __init__(self, svg_file_name: str, graph_config: Optional[Dict] = None):
+    def __init__(
+        self,
+        svg_file_name: str,
+        graph_config: Optional[Dict] = None,
+        layout_engine: str = "dot",
+        render_timeout: Optional[float] = None,
+        keep_dot: bool = False,
+    ):
         self.svg_file_name = svg_file_name
         self.graph_config = graph_config or {}
-        self.dot_file_name: str = "/tmp/graph.dot"
+        self.dot_file_name: Optional[str] = None
+        self.layout_engine = layout_engine
+        self.render_timeout = render_timeout
+        self.keep_dot = keep_dot
         self.node_color: str = self.graph_config.get("node_color", "white")
         self.background_color: str = self.graph_config.get("bgcolor", "transparent")
         self.layers: dict = self.graph_config.get("layers", {})
 
 
+class _LayerIndex:
+    """
+    Index of the graph layers by module prefix.
+
+    The layers of a module are found with a lookup per distinct prefix length,
+    instead of matching it against each prefix of each layer.
+    """
+
+    def __init__(self, layers: Dict[str, Dict]) -> None:
+        self._layers_by_prefix: Dict[str, Set[str]] = {}
+        for layer, layer_config in layers.items():
+            for prefix in layer_config["modules"]:
+                self._layers_by_prefix.setdefault(prefix, set()).add(layer)
+        self._prefix_lengths = sorted(
+            {len(prefix) for prefix in self._layers_by_prefix}
+        )
+
+    def get_layers(self, module: Module) -> Set[str]:
+        """
+        Return the layers having a prefix of the module.
+        """
+        layers: Set[str] = set()
+        for length in self._prefix_lengths:
+            if length > len(module):
+                break
+            layers.update(self._layers_by_prefix.get(module[:length], ()))
+        return layers
+
+
 class GraphDrawer(IGraphDrawer):
     """
     Write dot / svg files corresponding to the project dependencies
     """
 
-    def __init__(self, graph: Graph):
+    def __init__(self, graph: Graph, render_cache: bool = True):
         self.graph = graph
+        self.render_cache = render_cache
         self.header = Template(
             "digraph G {\n"
             "splines=true;\n"
             "node[shape=box fontname=Arial style=filled fillcolor={{nodecolor}}];\n"
             "bgcolor={{bgcolor}}\n\n\n"
         ).render(nodecolor=self.graph.node_color, bgcolor=self.graph.background_color)
-        self.body = ""
         self.footer = "}\n"
 
         self.subgraph = Template(
@@ -214,47 +326,159 @@ class GraphDrawer(IGraphDrawer):
     def _iter_layer_modules(
         self, global_dep: GlobalDependencies
     ) -> Iterator[Tuple[str, Iterable[Module]]]:
-        for layer in self.graph.layers:
-            yield layer, [
-                m
-                for m in iter_all_modules(global_dep)
-                if m.startswith(tuple(self.graph.layers[layer]["modules"]))
-            ]
+        """
+        Iterate over the layers, with the modules starting with one of their
+        prefixes, in a single pass over the modules.
+        """
+        if not self.graph.layers:
+            return
+        layer_index = _LayerIndex(self.graph.layers)
+        layer_modules: Dict[str, List[Module]] = {
+            layer: [] for layer in self.graph.layers
+        }
+        for module in iter_all_modules(global_dep):
+            for layer in layer_index.get_layers(module):
+                layer_modules[layer].append(module)
+        yield from layer_modules.items()
 
-    def _write_dot(self, global_dep: GlobalDependencies) -> bool:
-        if not global_dep:
-            return False
+    def _iter_dot(self, global_dep: GlobalDependencies) -> Iterator[str]:
+        """
+        Iterate over the chunks of the dot document, as they are produced:
+        the header, a subgraph per layer, the edges of each module, the footer.
 
+        Modules and edges are sorted, so that the same graph always gives the
+        same document, whatever the order its source files were scanned in.
+        """
+        yield self.header
         for layer, modules in self._iter_layer_modules(global_dep):
-            self.body += self.subgraph.render(
+            yield self.subgraph.render(
                 subgraph_name=layer,
                 color=self.graph.layers[layer].get("color", self.graph.node_color),
-                list_modules=str(modules)[1:-1].replace("'", '"'),
+                list_modules=str(sorted(modules))[1:-1].replace("'", '"'),
             )
 
-        for module, deps in global_dep.items():
-            for dep in deps:
-                self.body += f'"{module}" -> "{dep.main_import}"\n'
+        for module in sorted(global_dep):
+            dependencies = sorted({dep.main_import for dep in global_dep[module]})
+            yield "".join(f'"{module}" -> "{dep}"\n' for dep in dependencies)
+        yield self.footer
+
+    def write_dot(self, stream: TextIO, global_dep: GlobalDependencies) -> None:
+        """
+        Write the dot document to a stream (a file or a pipe), chunk by chunk,
+        without holding the whole document in memory.
+        """
+        stream.writelines(self._iter_dot(global_dep))
+
+    def _write_dot(self, global_dep: GlobalDependencies) -> bool:
+        if not global_dep or self.graph.dot_file_name is None:
+            return False
 
         with open(self.graph.dot_file_name, "w", encoding="utf-8") as out:
-            out.write(self.header)
-            out.write(self.body)
-            out.write(self.footer)
+            self.write_dot(out, global_dep)
 
         return True
 
-    def _write_svg(self) -> None:
-        svg_string = check_output(["dot", "-Tsvg", self.graph.dot_file_name]).decode()
+    @contextmanager
+    def _open_svg(self) -> Iterator[Optional[BinaryIO]]:
+        """
+        Open the svg file, None for stdout. It is removed if rendering fails.
+        """
         if self.graph.svg_file_name == "-":
-            stdout.write(svg_string)
-        else:
-            with open(self.graph.svg_file_name, "w", encoding="utf-8") as stream:
-                stream.write(svg_string)
+            stdout.flush()
+            yield None
+            return
+        try:
+            with open(self.graph.svg_file_name, "wb") as svg:
+                yield svg
+        except GraphRenderError:
+            os.remove(self.graph.svg_file_name)
+            raise
+
+    def _render(self, svg: Optional[BinaryIO], global_dep: GlobalDependencies) -> None:
+        """
+        Run the layout engine, streaming the dot document to its stdin (unless
+        it is kept in a file) and its svg output straight to the svg file.
+        """
+        engine = self.graph.layout_engine
+        dot_file = self.graph.dot_file_name
+        command = [engine, "-Tsvg", *([dot_file] if dot_file else [])]
+        try:
+            process = Popen(command, stdin=DEVNULL if dot_file else PIPE, stdout=svg)
+        except OSError as error:
+            raise GraphRenderError(f"Cannot run graphviz {engine}: {error}") from error
+        with process:
+            try:
+                if process.stdin is not None:
+                    with TextIOWrapper(process.stdin, encoding="utf-8") as dot:
+                        self.write_dot(dot, global_dep)
+                process.wait(self.graph.render_timeout)
+            except BrokenPipeError:
+                # The engine stopped reading, its exit code tells why
+                process.wait(self.graph.render_timeout)
+            except TimeoutExpired as error:
+                process.kill()
+                raise GraphRenderError(
+                    f"Graphviz {engine} timed out after {error.timeout}s"
+                ) from error
+        if process.returncode:
+            raise GraphRenderError(
+                f"Graphviz {engine} failed with exit code {process.returncode}"
+            )
+
+    def _hash_dot(self, global_dep: GlobalDependencies) -> str:
+        """
+        Hash the dot document, as it is produced, and the layout options.
+        """
+        digest = hashlib.blake2b(
+            f"{self.graph.layout_engine} -Tsvg\n".encode("utf-8"), digest_size=16
+        )
+        for chunk in self._iter_dot(global_dep):
+            digest.update(chunk.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _get_hash_path(self) -> Optional[Path]:
+        """
+        Return the file storing the hash of the rendered svg file, next to it,
+        None if the render cache is disabled or the svg is written to stdout.
+        """
+        if not self.render_cache or self.graph.svg_file_name == "-":
+            return None
+        return Path(f"{self.graph.svg_file_name}.hash")
+
+    def _is_rendered(self, hash_path: Path, dot_hash: str) -> bool:
+        return (
+            Path(self.graph.svg_file_name).is_file()
+            and hash_path.is_file()
+            and hash_path.read_text(encoding="utf-8") == dot_hash
+        )
+
+    def _write_svg(self, global_dep: GlobalDependencies) -> None:
+        """
+        Render the svg file, unless it was already rendered from the same dot
+        document and layout options.
+        """
+        if self.graph.keep_dot:
+            fd, self.graph.dot_file_name = tempfile.mkstemp(
+                prefix="dep_check_", suffix=".dot"
+            )
+            os.close(fd)
+            self._write_dot(global_dep)
+            logging.warning("Dot file written to %s", self.graph.dot_file_name)
+        hash_path = self._get_hash_path()
+        dot_hash = self._hash_dot(global_dep) if hash_path else ""
+        if hash_path and self._is_rendered(hash_path, dot_hash):
+            logging.info("Graph unchanged, %s not redrawn", self.graph.svg_file_name)
+            return
+        if hash_path:
+            hash_path.unlink(missing_ok=True)
+        with self._open_svg() as svg:
+            self._render(svg, global_dep)
+        if hash_path:
+            hash_path.write_text(dot_hash, encoding="utf-8")
 
     def write(self, global_dep: GlobalDependencies):
         if Path(self.graph.svg_file_name).suffix == ".dot":
             self.graph.dot_file_name = self.graph.svg_file_name
             self._write_dot(global_dep)
-        else:
-            if self._write_dot(global_dep):
-                self._write_svg()
+        elif global_dep:
+            self._write_svg(global_dep)
@@ -0,0 +1,74 @@
+"""
+Find the dependencies of source files over a pool of processes.
+"""
+
+import multiprocessing
+import os
+from typing import Iterable, Iterator, Optional
+
+from dep_check.dependency_finder import IParser
+from dep_check.models import (
+    Dependencies,
+    ModuleWildcard,
+    RegexRule,
+    SourceDependencies,
+    SourceFile,
+)
+
+# Parser of the current worker process, set once by the pool initializer
+_WORKER_PARSER: Optional[IParser] = None
+
+
+def _init_worker(parser: IParser) -> None:
+    global _WORKER_PARSER  # pylint: disable=global-statement
+    _WORKER_PARSER = parser
+
+
+def _find_source_dependencies(source_file: SourceFile) -> SourceDependencies:
+    assert _WORKER_PARSER is not None
+    return _WORKER_PARSER.find_source_dependencies(source_file)
+
+
+class ProcessPoolParser(IParser):
+    """
+    Parser decorator, scanning many source files over a pool of processes.
+
+    Source files are sent to the workers by chunks, and their dependencies
+    yielded back in the same order, so that reports stay deterministic.
+    """
+
+    def __init__(self, parser: IParser, jobs: int = 0, chunksize: int = 16) -> None:
+        self.parser = parser
+        self.jobs = jobs or os.cpu_count() or 1
+        self.chunksize = chunksize
+
+    def get_name(self) -> str:
+        return self.parser.get_name()
+
+    def is_concurrent(self) -> bool:
+        return self.jobs > 1
+
+    def wildcard_to_regex(self, module: ModuleWildcard) -> RegexRule:
+        return self.parser.wildcard_to_regex(module)
+
+    def find_dependencies(self, source_file: SourceFile) -> Dependencies:
+        return self.parser.find_dependencies(source_file)
+
+    def find_import_from_dependencies(self, source_file: SourceFile) -> Dependencies:
+        return self.parser.find_import_from_dependencies(source_file)
+
+    def find_source_dependencies(self, source_file: SourceFile) -> SourceDependencies:
+        return self.parser.find_source_dependencies(source_file)
+
+    def iter_source_dependencies(
+        self, source_files: Iterable[SourceFile]
+    ) -> Iterator[SourceDependencies]:
+        if self.jobs == 1:
+            yield from self.parser.iter_source_dependencies(source_files)
+            return
+        with multiprocessing.Pool(
+            self.jobs, initializer=_init_worker, initargs=(self.parser,)
+        ) as pool:
+            yield from pool.imap(
+                _find_source_dependencies, source_files, self.chunksize
+            )
@@ -1,5 +1,6 @@
 import ast
-from typing import Any, FrozenSet, List
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple, Type, Union
 
 from ordered_set import OrderedSet
 
@@ -13,72 +14,96 @@ from dep_check.models import (
     SourceFile,
 )
 
+ImportNode = Union[ast.Import, ast.ImportFrom]
+
+_IMPORT_LEXER = re.compile(
+    r"""
+    (?P<comment>\#[^\r\n]*)
+    | (?P<string>
+        (?<!\w)[rRbBuUfFtT]{0,2}
+        (?:\"\"\"(?:[^\\]|\\.)*?\"\"\"
+        | '''(?:[^\\]|\\.)*?'''
+        | "(?:[^"\\\r\n]|\\.)*"
+        | '(?:[^'\\\r\n]|\\.)*')
+    )
+    # An import statement at the beginning of a line, with its continuation
+    # lines and parenthesized names, up to a comment or the end of the line
+    | (?P<statement>
+        ^[ \t\f]*(?:import|from)\b
+        (?:[^\r\n(\\\#]|\\\r?\n|\([^)]*\))*
+    )
+    # Anything else needs the parser: an import keyword elsewhere, or a quote
+    # which does not start a string literal the lexer can read
+    | (?P<keyword>\bimport\b)
+    | (?P<quote>["'])
+    """,
+    re.VERBOSE | re.MULTILINE | re.DOTALL,
+)
 
-class _ImportVisitor(ast.NodeVisitor):
-    """
-    Implementation of a NodeVisitor, to scan import of a python code.
-    """
-
-    def __init__(self, current_module: str) -> None:
-        self._dependencies: Dependencies = OrderedSet()
-        self.current_module_parts: List[str] = current_module.split(".")
-
-    @property
-    def dependencies(self) -> Dependencies:
-        """
-        Dependencies found during the scan.
-        """
-        return self._dependencies
-
-    def visit(self, node: Any) -> None:
-        modules: FrozenSet[Dependency] = frozenset()
-        if isinstance(node, ast.Import):
-            modules = frozenset(Dependency(Module(alias.name)) for alias in node.names)
+# Fields holding nested statements (or except handlers / match cases, which
+# hold statements themselves). Expressions can never contain an import.
+_BODY_FIELDS = frozenset(("body", "orelse", "finalbody", "handlers", "cases"))
+_BODY_FIELDS_BY_TYPE: Dict[Type[ast.AST], Tuple[str, ...]] = {}
 
-        elif isinstance(node, ast.ImportFrom):
-            module = Module(node.module or "")
-            if node.level:
-                parent_module = ".".join(self.current_module_parts[: -node.level])
-                if node.module:
-                    module = Module(f"{parent_module}.{node.module}")
-                else:
-                    module = Module(parent_module)
-            modules = frozenset((Dependency(module),))
-        self._dependencies |= modules
 
-        super().visit(node)
+def _get_body_fields(node: ast.AST) -> Tuple[str, ...]:
+    """
+    Return the fields of a node holding nested statements, in the order
+    they appear in the source code.
+    """
+    node_type = type(node)
+    if node_type not in _BODY_FIELDS_BY_TYPE:
+        _BODY_FIELDS_BY_TYPE[node_type] = tuple(
+            f for f in node._fields if f in _BODY_FIELDS
+        )
+    return _BODY_FIELDS_BY_TYPE[node_type]
 
 
-class _ImportFromVisitor(ast.NodeVisitor):
-    def __init__(self, current_module: str) -> None:
-        self._dependencies: Dependencies = OrderedSet()
-        self.current_module_parts: List[str] = current_module.split(".")
+def _iter_import_nodes(nodes: Iterable[ast.AST]) -> Iterator[ImportNode]:
+    """
+    Iterate over import statements, only descending into statement bodies.
+    """
+    for node in nodes:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node
+        else:
+            for field in _get_body_fields(node):
+                yield from _iter_import_nodes(getattr(node, field))
 
-    @property
-    def dependencies(self) -> Dependencies:
-        """
-        Dependencies found during the scan.
-        """
-        return self._dependencies
 
-    def visit(self, node: Any) -> None:
-        modules: FrozenSet[Dependency] = frozenset()
+def _get_import_from_module(
+    node: ast.ImportFrom, current_module_parts: List[str]
+) -> Module:
+    """
+    Return the absolute module of a "from ... import" statement.
+    """
+    module = Module(node.module or "")
+    if node.level:
+        parent_module = ".".join(current_module_parts[: -node.level])
+        if node.module:
+            module = Module(f"{parent_module}.{node.module}")
+        else:
+            module = Module(parent_module)
+    return module
+
+
+def _iter_dependencies(
+    tree: ast.Module, current_module: str, with_sub_imports: bool
+) -> Iterator[Dependency]:
+    """
+    Iterate over the dependencies of a parsed module, in the source code order.
+    """
+    current_module_parts = current_module.split(".")
+    for node in _iter_import_nodes(tree.body):
         if isinstance(node, ast.Import):
-            modules = frozenset(Dependency(Module(alias.name)) for alias in node.names)
-        elif isinstance(node, ast.ImportFrom):
-            module = Module(node.module or "")
-            if node.level:
-                parent_module = ".".join(self.current_module_parts[: -node.level])
-                if node.module:
-                    module = Module(f"{parent_module}.{node.module}")
-                else:
-                    module = Module(parent_module)
-            sub_imports = frozenset(Module(alias.name) for alias in node.names)
-            modules = frozenset((Dependency(module, sub_imports),))
-
-        self._dependencies |= modules
-
-        super().visit(node)
+            yield from (Dependency(Module(alias.name)) for alias in node.names)
+        elif with_sub_imports:
+            yield Dependency(
+                _get_import_from_module(node, current_module_parts),
+                frozenset(Module(alias.name) for alias in node.names),
+            )
+        else:
+            yield Dependency(_get_import_from_module(node, current_module_parts))
 
 
 class PythonParser(IParser):
@@ -105,20 +130,85 @@ class PythonParser(IParser):
 
         return RegexRule(regex=module_regex, raise_if_found=raise_if_found)
 
+    def _parse(self, source_file: SourceFile) -> List[ast.Module]:
+        """
+        Parse a python source file into the trees holding its import statements.
+        """
+        return [ast.parse(source_file.content)]
+
+    def _find_dependencies(
+        self, source_file: SourceFile, with_sub_imports: bool
+    ) -> Dependencies:
+        return OrderedSet(
+            [
+                dependency
+                for tree in self._parse(source_file)
+                for dependency in _iter_dependencies(
+                    tree, source_file.module, with_sub_imports
+                )
+            ]
+        )
+
     def find_dependencies(self, source_file: SourceFile) -> Dependencies:
         """
         Scan a python source file and return its dependencies.
         """
-        visitor = _ImportVisitor(source_file.module)
-        node = ast.parse(source_file.code)
-        visitor.visit(node)
-        return visitor.dependencies
+        return self._find_dependencies(source_file, False)
 
     def find_import_from_dependencies(self, source_file: SourceFile) -> Dependencies:
         """
         Scan a python source file and return its dependencies.
         """
-        visitor = _ImportFromVisitor(source_file.module)
-        node = ast.parse(source_file.code)
-        visitor.visit(node)
-        return visitor.dependencies
+        return self._find_dependencies(source_file, True)
+
+
+class _AmbiguousSourceError(Exception):
+    """
+    Raised when the lexer cannot reliably find all import statements of a source.
+    """
+
+
+def _is_well_lexed(string: str) -> bool:
+    """
+    Check that a string literal has been lexed entirely: an f-string nesting
+    quotes (allowed since python 3.12) is cut short, with unbalanced braces.
+    """
+    prefix = string[: len(string) - len(string.lstrip("rRbBuUfFtT"))].lower()
+    if "f" not in prefix and "t" not in prefix:
+        return True
+    body = string.replace("{{", "").replace("}}", "")
+    return body.count("{") == body.count("}")
+
+
+def _iter_import_statements(code: str) -> Iterator[str]:
+    """
+    Iterate over the import statements of a source code, without parsing it.
+    """
+    for match in _IMPORT_LEXER.finditer(code):
+        kind = match.lastgroup
+        if kind == "statement":
+            yield match.group().lstrip()
+        elif kind != "comment" and (
+            kind != "string" or not _is_well_lexed(match.group())
+        ):
+            raise _AmbiguousSourceError(match.group())
+
+
+class PythonLexerParser(PythonParser):
+    """
+    Implementation of the interface, only parsing the import statements found
+    by a lexer, which skips comments and string literals.
+
+    It falls back to parsing the whole file when the lexer meets an import
+    which is not at the beginning of a line, or a string it cannot read.
+    The rest of the file is not validated.
+    """
+
+    def _parse(self, source_file: SourceFile) -> List[ast.Module]:
+        try:
+            return [
+                ast.parse(statement)
+                for statement in _iter_import_statements(source_file.code)
+            ]
+        except (_AmbiguousSourceError, SyntaxError):
+            return super()._parse(source_file)
@@ -0,0 +1,341 @@
+"""
+Machine-readable implementations of IReporter, written as source files are checked.
+"""
+
+import json
+import sys
+import time
+from abc import ABC
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from dep_check import __version__
+from dep_check.models import Module, Rule, Rules
+from dep_check.use_cases.check import DependencyError, IReporter
+from dep_check.use_cases.interfaces import Configuration, UnusedLevel
+
+_FORBIDDEN_IMPORT = "forbidden-import"
+_UNUSED_RULE = "unused-rule"
+
+
+def open_report(path: str) -> ContextManager[TextIO]:
+    """
+    Open the report output file, `-` for stdout.
+    """
+    if path == "-":
+        return nullcontext(sys.stdout)
+    return open(path, "w", encoding="utf-8")
+
+
+def _format_error(error: DependencyError) -> str:
+    return (
+        f"{error.module} imports {error.dependency}, "
+        f"but only allowed to import {list(error.rules)}"
+    )
+
+
+def _get_uri(path: str) -> str:
+    file_path = Path(path)
+    return file_path.as_uri() if file_path.is_absolute() else file_path.as_posix()
+
+
+class _TimedReporter(IReporter, ABC):
+    """
+    Base reporter, counting errors and timing each source file.
+
+    The time of a source file runs from the end of the previous one, so it
+    includes reading and parsing it. Unused rules are located in the
+    configuration file, if its path is given.
+    """
+
+    def __init__(
+        self,
+        configuration: Configuration,
+        stream: TextIO,
+        config_path: Optional[str] = None,
+    ) -> None:
+        self.configuration = configuration
+        self.stream = stream
+        self.config_path = config_path
+        self.nb_errors = 0
+        self._start = time.perf_counter()
+        self._file_start = self._start
+
+    def begin(self) -> None:
+        self.nb_errors = 0
+        self._start = time.perf_counter()
+        self._file_start = self._start
+
+    def on_error(self, error: DependencyError) -> None:
+        self.nb_errors += 1
+
+    def _get_file_duration(self) -> float:
+        now = time.perf_counter()
+        duration, self._file_start = now - self._file_start, now
+        return duration
+
+    def _get_duration(self) -> float:
+        return time.perf_counter() - self._start
+
+    @property
+    def unused_level(self) -> str:
+        return self.configuration.unused_level
+
+
+class JsonLinesReporter(_TimedReporter):
+    """
+    Write one JSON object per line: each error, each checked file (with its
+    duration and used rules), each unused rule and a final summary.
+    """
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(record) + "\n")
+
+    def on_error(self, error: DependencyError) -> None:
+        super().on_error(error)
+        self._write(
+            {
+                "type": "error",
+                "module": error.module,
+                "dependency": error.dependency,
+                "rules": list(error.rules),
+            }
+        )
+
+    def on_file_done(
+        self, module: Module, used_rules: Tuple[Rule, ...], path: Optional[str] = None
+    ) -> None:
+        self._write(
+            {
+                "type": "file",
+                "module": module,
+                "path": path,
+                "duration": round(self._get_file_duration(), 6),
+                "used_rules": [list(rule) for rule in used_rules],
+            }
+        )
+        self.stream.flush()
+
+    def end(self, unused_rules: Rules, nb_files: int) -> None:
+        for wildcard, rule in unused_rules:
+            self._write(
+                {
+                    "type": "unused_rule",
+                    "level": self.unused_level,
+                    "rule": [wildcard, rule],
+                }
+            )
+        self._write(
+            {
+                "type": "summary",
+                "nb_files": nb_files,
+                "nb_errors": self.nb_errors,
+                "nb_unused_rules": len(unused_rules),
+                "duration": round(self._get_duration(), 6),
+            }
+        )
+        self.stream.flush()
+
+
+class SarifReporter(_TimedReporter):
+    """
+    Write a SARIF 2.1.0 log, with a result per error and per unused rule.
+
+    Results are written as they come, located in their source file (or in the
+    configuration file, for unused rules). The checked files, their duration
+    and used rules are written at the end, in the run properties.
+    """
+
+    def __init__(
+        self,
+        configuration: Configuration,
+        stream: TextIO,
+        config_path: Optional[str] = None,
+    ) -> None:
+        super().__init__(configuration, stream, config_path)
+        self._nb_results = 0
+        self._files: List[Dict[str, Any]] = []
+
+    def begin(self) -> None:
+        super().begin()
+        self._nb_results = 0
+        self._files = []
+        tool = {
+            "driver": {
+                "name": "dep_check",
+                "version": __version__,
+                "informationUri": "https://github.com/lumapps/dep-check",
+                "rules": [
+                    {
+                        "id": _FORBIDDEN_IMPORT,
+                        "shortDescription": {
+                            "text": "Import not allowed by the dependency rules"
+                        },
+                    },
+                    {
+                        "id": _UNUSED_RULE,
+                        "shortDescription": {
+                            "text": "Dependency rule not used by any module"
+                        },
+                    },
+                ],
+            }
+        }
+        self.stream.write(
+            '{"version": "2.1.0", '
+            '"$schema": "https://json.schemastore.org/sarif-2.1.0.json", '
+            f'"runs": [{{"tool": {json.dumps(tool)}, "results": ['
+        )
+
+    @staticmethod
+    def _get_location(name: str, path: Optional[str]) -> Dict[str, Any]:
+        location: Dict[str, Any] = {
+            "logicalLocations": [{"fullyQualifiedName": name, "kind": "module"}]
+        }
+        if path is not None:
+            # The lines of the imports are not known
+            location["physicalLocation"] = {
+                "artifactLocation": {"uri": _get_uri(path)},
+                "region": {"startLine": 1},
+            }
+        return location
+
+    def _write_result(self, result: Dict[str, Any]) -> None:
+        separator = ", " if self._nb_results else ""
+        self.stream.write(f"\n{separator}{json.dumps(result)}")
+        self._nb_results += 1
+
+    def on_error(self, error: DependencyError) -> None:
+        super().on_error(error)
+        self._write_result(
+            {
+                "ruleId": _FORBIDDEN_IMPORT,
+                "level": "error",
+                "message": {"text": _format_error(error)},
+                "locations": [self._get_location(error.module, error.path)],
+                "properties": {
+                    "dependency": error.dependency,
+                    "rules": list(error.rules),
+                },
+            }
+        )
+
+    def on_file_done(
+        self, module: Module, used_rules: Tuple[Rule, ...], path: Optional[str] = None
+    ) -> None:
+        self._files.append(
+            {
+                "module": module,
+                "path": path,
+                "duration": round(self._get_file_duration(), 6),
+                "usedRules": [list(rule) for rule in used_rules],
+            }
+        )
+        self.stream.flush()
+
+    def end(self, unused_rules: Rules, nb_files: int) -> None:
+        level = "error" if self.unused_level == UnusedLevel.ERROR.value else "warning"
+        for wildcard, rule in unused_rules:
+            self._write_result(
+                {
+                    "ruleId": _UNUSED_RULE,
+                    "level": level,
+                    "message": {"text": f"Unused rule {wildcard}: {rule}"},
+                    "locations": [self._get_location(wildcard, self.config_path)],
+                    "properties": {"rule": [wildcard, rule]},
+                }
+            )
+        properties = {
+            "nbFiles": nb_files,
+            "duration": round(self._get_duration(), 6),
+            "files": self._files,
+        }
+        self.stream.write(f'\n], "properties": {json.dumps(properties)}}}]}}\n')
+        self.stream.flush()
+
+
+class JUnitReporter(_TimedReporter):
+    """
+    Write a JUnit XML report, with a test case per checked file, failed by its
+    errors, and a test case for the unused rules (of the configuration file).
+    """
+
+    def __init__(
+        self,
+        configuration: Configuration,
+        stream: TextIO,
+        config_path: Optional[str] = None,
+    ) -> None:
+        super().__init__(configuration, stream, config_path)
+        self._module_errors: List[DependencyError] = []
+
+    def begin(self) -> None:
+        super().begin()
+        self._module_errors = []
+        self.stream.write(
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<testsuites name="dep_check">\n'
+            '<testsuite name="dep_check">\n'
+        )
+
+    def on_error(self, error: DependencyError) -> None:
+        super().on_error(error)
+        self._module_errors.append(error)
+
+    def _write_test_case(
+        self,
+        attributes: Dict[str, Optional[str]],
+        failures: List[str],
+        output: List[str],
+    ) -> None:
+        """
+        Write a test case, with its name, time and file (if known) attributes.
+        """
+        quoted = "".join(
+            f" {key}={quoteattr(value)}"
+            for key, value in attributes.items()
+            if value is not None
+        )
+        self.stream.write(f'<testcase classname="dep_check"{quoted}>\n')
+        if failures:
+            text = escape("\n".join(failures))
+            self.stream.write(
+                f"<failure message={quoteattr(failures[0])}>{text}</failure>\n"
+            )
+        if output:
+            text = escape("\n".join(output))
+            self.stream.write(f"<system-out>{text}</system-out>\n")
+        self.stream.write("</testcase>\n")
+
+    def on_file_done(
+        self, module: Module, used_rules: Tuple[Rule, ...], path: Optional[str] = None
+    ) -> None:
+        self._write_test_case(
+            {
+                "name": module,
+                "time": f"{self._get_file_duration():.6f}",
+                "file": path,
+            },
+            [_format_error(error) for error in self._module_errors],
+            [f"Used rule {wildcard}: {rule}" for wildcard, rule in used_rules],
+        )
+        self._module_errors = []
+        self.stream.flush()
+
+    def end(self, unused_rules: Rules, nb_files: int) -> None:
+        messages = [
+            f"Unused rule {wildcard}: {rule}" for wildcard, rule in unused_rules
+        ]
+        attributes = {
+            "name": "unused rules",
+            "time": "0.000000",
+            "file": self.config_path,
+        }
+        if self.unused_level == UnusedLevel.ERROR.value:
+            self._write_test_case(attributes, messages, [])
+        else:
+            self._write_test_case(attributes, [], messages)
+        self.stream.write("</testsuite>\n</testsuites>\n")
+        self.stream.flush()
@@ -2,6 +2,9 @@
 Implementations of IStdLibFilter
 """
 
+import sys
+from typing import AbstractSet
+
 from ordered_set import OrderedSet
 
 from dep_check.models import Dependencies
@@ -329,17 +332,29 @@ _KNOWN_STANDARD_LIBRARIES = frozenset(
 )
 
 
+# Exact list of the running python version, from python 3.10
+_STANDARD_LIBRARIES = _KNOWN_STANDARD_LIBRARIES.union(
+    getattr(sys, "stdlib_module_names", ())
+)
+
+
 class StdLibSimpleFilter(IStdLibFilter):
     """
-    A simple stdlib filter based on handwritten list.
+    A simple stdlib filter based on handwritten list, and the one of the
+    running python version if available.
+
+    Dependencies are filtered on their top-level package name only, so that
+    `os.path` is filtered out but not `osmnx`.
     """
 
+    def __init__(self, std_lib_modules: AbstractSet[str] = _STANDARD_LIBRARIES):
+        self.std_lib_modules = frozenset(std_lib_modules)
+
     def filter(self, dependencies: Dependencies) -> Dependencies:
         return OrderedSet(
-            dependencies
-            - {
+            [
                 dep
                 for dep in dependencies
-                if dep.main_import.startswith(tuple(_KNOWN_STANDARD_LIBRARIES))
-            }
+                if dep.main_import.partition(".")[0] not in self.std_lib_modules
+            ]
         )
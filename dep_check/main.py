@@ -7,28 +7,77 @@ import argparse
 import logging
 import os
 import sys
+from contextlib import ExitStack
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Iterator, List, Optional, TextIO, Union
 
-from dep_check.infra.file_system import source_file_iterator
+from dep_check.dependency_finder import IParser
+from dep_check.infra.cache import CachedParser, CheckResultStore, DependencyCache
+from dep_check.infra.file_system import (
+    DEFAULT_EXCLUDES,
+    ExcludePatterns,
+    GitListingError,
+    changed_source_files,
+    git_source_file_iterator,
+    read_changed_paths,
+    source_file_iterator,
+)
 from dep_check.infra.io import (
     Graph,
     GraphDrawer,
+    GraphRenderError,
     ReportPrinter,
+    StreamReportPrinter,
     YamlConfigurationIO,
     read_graph_config,
 )
-from dep_check.infra.python_parser import PythonParser
+from dep_check.infra.process_pool import ProcessPoolParser
+from dep_check.infra.python_parser import PythonLexerParser, PythonParser
+from dep_check.infra.reporters import (
+    JsonLinesReporter,
+    JUnitReporter,
+    SarifReporter,
+    open_report,
+)
 from dep_check.infra.std_lib_filter import StdLibSimpleFilter
+from dep_check.models import SourceFile
 from dep_check.use_cases.app_configuration import (
     AppConfiguration,
     AppConfigurationSingleton,
 )
 from dep_check.use_cases.build import BuildConfigurationUC
-from dep_check.use_cases.check import CheckDependenciesUC, ForbiddenError
+from dep_check.use_cases.check import (
+    CheckDependenciesUC,
+    ForbiddenError,
+    IReporter,
+    IReportPrinter,
+)
+from dep_check.use_cases.check_and_draw_graph import CheckAndDrawGraphUC
 from dep_check.use_cases.draw_graph import DrawGraphUC
-from dep_check.use_cases.interfaces import UnusedLevel
+from dep_check.use_cases.incremental_check import IncrementalCheckUC
+from dep_check.use_cases.interfaces import Configuration, UnusedLevel
+
+
+def positive_int(value: str) -> int:
+    """
+    Argument type of strictly positive numbers.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """
+    Argument type of positive numbers or zero.
+    """
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"{value} is a negative number")
+    return number
+
 
 ROOT_PATH_FLAGS = ("-r", "--root")
 ROOT_PATH_ARGUMENTS: dict[str, Any] = {
@@ -37,6 +86,111 @@ ROOT_PATH_ARGUMENTS: dict[str, Any] = {
     "help": "The path of project root module (default: current working directory)",
 }
 
+PYTHON_PARSERS = {"ast": PythonParser, "lexer": PythonLexerParser}
+PARSER_FLAGS = ("--parser",)
+PARSER_ARGUMENTS: dict[str, Any] = {
+    "type": str,
+    "choices": tuple(PYTHON_PARSERS),
+    "default": "ast",
+    "help": "How to find imports: parse whole files, or only the import statements "
+    "found by a lexer (default: ast)",
+}
+
+NO_CACHE_FLAGS = ("--no-cache",)
+NO_CACHE_ARGUMENTS: dict[str, Any] = {
+    "action": "store_true",
+    "help": "Scan all source files, without reading nor writing the cache",
+}
+CACHE_DIR_FLAGS = ("--cache-dir",)
+CACHE_DIR_ARGUMENTS: dict[str, Any] = {
+    "type": Path,
+    "default": Path(".dep_check_cache"),
+    "help": "The directory of the dependencies cache (default: .dep_check_cache)",
+}
+
+JOBS_FLAGS = ("-j", "--jobs")
+JOBS_ARGUMENTS: dict[str, Any] = {
+    "type": non_negative_int,
+    "default": 1,
+    "help": "The number of processes scanning source files, 0 to use all CPUs "
+    "(default: 1)",
+}
+
+WALK_THREADS_FLAGS = ("--walk-threads",)
+WALK_THREADS_ARGUMENTS: dict[str, Any] = {
+    "type": int,
+    "default": 1,
+    "help": "The number of threads listing directories, e.g. on network file "
+    "systems (default: 1)",
+}
+
+EXCLUDE_FLAGS = ("--exclude",)
+EXCLUDE_ARGUMENTS: dict[str, Any] = {
+    "nargs": "*",
+    "metavar": "PATTERN",
+    "help": "Glob patterns of the files and directories not to scan, e.g. "
+    "'.venv', 'build/' or 'docs/*.py', replacing the default ones "
+    f"(default: {' '.join(DEFAULT_EXCLUDES)})",
+}
+EXTEND_EXCLUDE_FLAGS = ("--extend-exclude",)
+EXTEND_EXCLUDE_ARGUMENTS: dict[str, Any] = {
+    "nargs": "+",
+    "default": [],
+    "metavar": "PATTERN",
+    "help": "Glob patterns of the files and directories not to scan, in "
+    "addition to the excluded ones",
+}
+GITIGNORE_FLAGS = ("--gitignore",)
+GITIGNORE_ARGUMENTS: dict[str, Any] = {
+    "action": "store_true",
+    "help": "Do not scan the files and directories ignored by the .gitignore files",
+}
+
+FROM_GIT_FLAGS = ("--from-git",)
+FROM_GIT_ARGUMENTS: dict[str, Any] = {
+    "action": "store_true",
+    "help": "List the source files from the git index, instead of walking the "
+    "source dirs",
+}
+UNTRACKED_FLAGS = ("--untracked",)
+UNTRACKED_ARGUMENTS: dict[str, Any] = {
+    "action": "store_true",
+    "help": "With --from-git, also list the untracked files not ignored by git",
+}
+
+LAYOUT_ENGINE_FLAGS = ("--layout-engine",)
+LAYOUT_ENGINE_ARGUMENTS: dict[str, Any] = {
+    "type": str,
+    "choices": ("dot", "neato", "fdp", "sfdp", "circo", "twopi", "osage"),
+    "default": "dot",
+    "help": "The graphviz layout engine drawing the graph, e.g. sfdp for big "
+    "graphs (default: dot)",
+}
+RENDER_TIMEOUT_FLAGS = ("--render-timeout",)
+RENDER_TIMEOUT_ARGUMENTS: dict[str, Any] = {
+    "type": float,
+    "help": "The maximum number of seconds to draw the graph (default: no limit)",
+}
+KEEP_DOT_FLAGS = ("--keep-dot",)
+KEEP_DOT_ARGUMENTS: dict[str, Any] = {
+    "action": "store_true",
+    "help": "Also write the dot file of the graph, to a unique temporary file",
+}
+
+# Report printers, created from the configuration, the output stream and the
+# configuration file path
+REPORT_FORMATS: dict[
+    str, Callable[[Configuration, TextIO, str], Union[IReportPrinter, IReporter]]
+] = {
+    "text": lambda configuration, stream, _: ReportPrinter(configuration, stream),
+    "text-stream": lambda configuration, stream, _: StreamReportPrinter(
+        configuration, stream
+    ),
+    "jsonl": JsonLinesReporter,
+    "sarif": SarifReporter,
+    "junit": JUnitReporter,
+}
+
 FEATURE_PARSER = argparse.ArgumentParser(description="Chose your feature")
 FEATURE_PARSER.add_argument(
     "feature",
@@ -60,6 +214,16 @@ BUILD_PARSER.add_argument(
     default="dependency_config.yaml",
 )
 BUILD_PARSER.add_argument(*ROOT_PATH_FLAGS, **ROOT_PATH_ARGUMENTS)
+BUILD_PARSER.add_argument(*PARSER_FLAGS, **PARSER_ARGUMENTS)
+BUILD_PARSER.add_argument(*NO_CACHE_FLAGS, **NO_CACHE_ARGUMENTS)
+BUILD_PARSER.add_argument(*CACHE_DIR_FLAGS, **CACHE_DIR_ARGUMENTS)
+BUILD_PARSER.add_argument(*JOBS_FLAGS, **JOBS_ARGUMENTS)
+BUILD_PARSER.add_argument(*WALK_THREADS_FLAGS, **WALK_THREADS_ARGUMENTS)
+BUILD_PARSER.add_argument(*EXCLUDE_FLAGS, **EXCLUDE_ARGUMENTS)
+BUILD_PARSER.add_argument(*EXTEND_EXCLUDE_FLAGS, **EXTEND_EXCLUDE_ARGUMENTS)
+BUILD_PARSER.add_argument(*GITIGNORE_FLAGS, **GITIGNORE_ARGUMENTS)
+BUILD_PARSER.add_argument(*FROM_GIT_FLAGS, **FROM_GIT_ARGUMENTS)
+BUILD_PARSER.add_argument(*UNTRACKED_FLAGS, **UNTRACKED_ARGUMENTS)
 
 
 CHECK_PARSER = argparse.ArgumentParser(description="Check the dependencies")
@@ -82,7 +246,66 @@ CHECK_PARSER.add_argument(
     choices=tuple(l.value for l in UnusedLevel),
     help="Disable unused warning/error.",
 )
+CHECK_PARSER.add_argument(
+    "--max-errors",
+    type=positive_int,
+    help="Stop checking source files once this number of errors is reached.",
+)
+CHECK_PARSER.add_argument(
+    "--fail-fast",
+    action="store_const",
+    const=1,
+    dest="max_errors",
+    help="Stop checking source files at the first error, same as --max-errors 1.",
+)
+CHECK_PARSER.add_argument(
+    "--format",
+    type=str,
+    choices=tuple(REPORT_FORMATS),
+    default="text",
+    help="The report format: text groups errors by module once all files are "
+    "checked, the other ones are written as each file is checked (default: text)",
+)
+CHECK_PARSER.add_argument(
+    "-o",
+    "--output",
+    type=str,
+    help="The file to write the report to, - for stdout (default: -)",
+    default="-",
+)
+CHECK_PARSER.add_argument(
+    "-g",
+    "--graph",
+    type=str,
+    help="Also draw the dependency graph in this svg/dot file, from the same scan",
+)
+CHECK_PARSER.add_argument(
+    "--graph-config",
+    type=str,
+    help="The yaml file representing the graph options, used with --graph.",
+)
+CHECK_PARSER.add_argument(
+    "--changed-files",
+    nargs="+",
+    type=str,
+    help="Only check these files, reusing the cached results of the others. "
+    "Use - to read them from stdin, e.g. from git diff --name-only. "
+    "Not allowed with --no-cache or --graph.",
+)
 CHECK_PARSER.add_argument(*ROOT_PATH_FLAGS, **ROOT_PATH_ARGUMENTS)
+CHECK_PARSER.add_argument(*PARSER_FLAGS, **PARSER_ARGUMENTS)
+CHECK_PARSER.add_argument(*NO_CACHE_FLAGS, **NO_CACHE_ARGUMENTS)
+CHECK_PARSER.add_argument(*CACHE_DIR_FLAGS, **CACHE_DIR_ARGUMENTS)
+CHECK_PARSER.add_argument(*JOBS_FLAGS, **JOBS_ARGUMENTS)
+CHECK_PARSER.add_argument(*WALK_THREADS_FLAGS, **WALK_THREADS_ARGUMENTS)
+CHECK_PARSER.add_argument(*EXCLUDE_FLAGS, **EXCLUDE_ARGUMENTS)
+CHECK_PARSER.add_argument(*EXTEND_EXCLUDE_FLAGS, **EXTEND_EXCLUDE_ARGUMENTS)
+CHECK_PARSER.add_argument(*GITIGNORE_FLAGS, **GITIGNORE_ARGUMENTS)
+CHECK_PARSER.add_argument(*FROM_GIT_FLAGS, **FROM_GIT_ARGUMENTS)
+CHECK_PARSER.add_argument(*UNTRACKED_FLAGS, **UNTRACKED_ARGUMENTS)
+CHECK_PARSER.add_argument(*LAYOUT_ENGINE_FLAGS, **LAYOUT_ENGINE_ARGUMENTS)
+CHECK_PARSER.add_argument(*RENDER_TIMEOUT_FLAGS, **RENDER_TIMEOUT_ARGUMENTS)
+CHECK_PARSER.add_argument(*KEEP_DOT_FLAGS, **KEEP_DOT_ARGUMENTS)
 
 GRAPH_PARSER = argparse.ArgumentParser(description="Draw a dependency graph")
 GRAPH_PARSER.add_argument(
@@ -102,6 +325,19 @@ GRAPH_PARSER.add_argument(
     "-c", "--config", type=str, help="The yaml file representing the graph options."
 )
 GRAPH_PARSER.add_argument(*ROOT_PATH_FLAGS, **ROOT_PATH_ARGUMENTS)
+GRAPH_PARSER.add_argument(*PARSER_FLAGS, **PARSER_ARGUMENTS)
+GRAPH_PARSER.add_argument(*NO_CACHE_FLAGS, **NO_CACHE_ARGUMENTS)
+GRAPH_PARSER.add_argument(*CACHE_DIR_FLAGS, **CACHE_DIR_ARGUMENTS)
+GRAPH_PARSER.add_argument(*JOBS_FLAGS, **JOBS_ARGUMENTS)
+GRAPH_PARSER.add_argument(*WALK_THREADS_FLAGS, **WALK_THREADS_ARGUMENTS)
+GRAPH_PARSER.add_argument(*EXCLUDE_FLAGS, **EXCLUDE_ARGUMENTS)
+GRAPH_PARSER.add_argument(*EXTEND_EXCLUDE_FLAGS, **EXTEND_EXCLUDE_ARGUMENTS)
+GRAPH_PARSER.add_argument(*GITIGNORE_FLAGS, **GITIGNORE_ARGUMENTS)
+GRAPH_PARSER.add_argument(*FROM_GIT_FLAGS, **FROM_GIT_ARGUMENTS)
+GRAPH_PARSER.add_argument(*UNTRACKED_FLAGS, **UNTRACKED_ARGUMENTS)
+GRAPH_PARSER.add_argument(*LAYOUT_ENGINE_FLAGS, **LAYOUT_ENGINE_ARGUMENTS)
+GRAPH_PARSER.add_argument(*RENDER_TIMEOUT_FLAGS, **RENDER_TIMEOUT_ARGUMENTS)
+GRAPH_PARSER.add_argument(*KEEP_DOT_FLAGS, **KEEP_DOT_ARGUMENTS)
 
 
 class MissingOptionError(Exception):
@@ -134,13 +370,17 @@ class MainApp:
         except KeyError as error:
             raise MissingOptionError() from error
 
+        # Resources opened by the components, closed once the use case has run
+        self.resources = ExitStack()
+
     def main(self) -> None:
         self.create_app_configuration()
-        try:
-            use_case = DEP_CHECK_FEATURES[self.feature].use_case_factory(self)
-            use_case.run()
-        except KeyError as error:
-            raise MissingOptionError() from error
+        with self.resources:
+            try:
+                use_case = DEP_CHECK_FEATURES[self.feature].use_case_factory(self)
+                use_case.run()
+            except KeyError as error:
+                raise MissingOptionError() from error
 
     @staticmethod
     def create_app_configuration() -> None:
@@ -150,40 +390,154 @@ class MainApp:
         app_configuration = AppConfiguration(std_lib_filter=StdLibSimpleFilter())
         AppConfigurationSingleton.define_app_configuration(app_configuration)
 
+    def create_cache(self) -> Optional[DependencyCache]:
+        """
+        Open the dependencies cache, unless disabled for this run.
+        """
+        if self.args.no_cache:
+            return None
+        return self.resources.enter_context(DependencyCache(self.args.cache_dir))
+
+    def create_code_parser(self, cache: Optional[DependencyCache]) -> IParser:
+        """
+        Create the code parser selected for this run.
+        """
+        code_parser: IParser = PYTHON_PARSERS[self.args.parser]()
+        if self.args.jobs != 1:
+            code_parser = ProcessPoolParser(code_parser, self.args.jobs)
+        if cache is None:
+            return code_parser
+        return CachedParser(code_parser, cache)
+
+    def get_excludes(self) -> List[str]:
+        """
+        Return the patterns of the files and directories not to scan.
+        """
+        exclude = self.args.exclude
+        if exclude is None:
+            exclude = DEFAULT_EXCLUDES
+        return [*exclude, *self.args.extend_exclude]
+
+    def create_source_files(self) -> Iterator[SourceFile]:
+        """
+        Create the iterator of the source files to scan.
+        """
+        exclude_patterns = ExcludePatterns(self.get_excludes())
+        if self.args.from_git:
+            return git_source_file_iterator(
+                self.args.modules,
+                self.args.root,
+                exclude_patterns,
+                untracked=self.args.untracked,
+            )
+        return source_file_iterator(
+            self.args.modules,
+            self.args.root,
+            exclude_patterns,
+            gitignore=self.args.gitignore,
+            threads=self.args.walk_threads,
+        )
+
     def create_build_use_case(self) -> BuildConfigurationUC:
         """
         Plumbing to make build use case working.
         """
         configuration_io = YamlConfigurationIO(self.args.output)
-        code_parser = PythonParser()
-        source_files = source_file_iterator(self.args.modules, self.args.root)
+        code_parser = self.create_code_parser(self.create_cache())
+        source_files = self.create_source_files()
         return BuildConfigurationUC(configuration_io, code_parser, source_files)
 
-    def create_check_use_case(self) -> CheckDependenciesUC:
+    def create_check_use_case(
+        self,
+    ) -> Union[CheckDependenciesUC, CheckAndDrawGraphUC, IncrementalCheckUC]:
         """
         Plumbing to make check use case working.
         """
+        if self.args.changed_files and (self.args.no_cache or self.args.graph):
+            CHECK_PARSER.error(
+                "--changed-files cannot be used with --no-cache or --graph"
+            )
         configuration = YamlConfigurationIO(self.args.config).read()
         if self.args.unused:
             configuration.unused_level = self.args.unused
-        code_parser = PythonParser()
-        report_printer = ReportPrinter(configuration)
-        source_files = source_file_iterator(self.args.modules, self.args.root)
-        return CheckDependenciesUC(
-            configuration, report_printer, code_parser, source_files
+        cache = self.create_cache()
+        code_parser = self.create_code_parser(cache)
+        report_stream = self.resources.enter_context(open_report(self.args.output))
+        report_printer = REPORT_FORMATS[self.args.format](
+            configuration, report_stream, self.args.config
         )
+        source_files = self.create_source_files()
+        check_use_case = CheckDependenciesUC(
+            configuration,
+            report_printer,
+            code_parser,
+            source_files,
+            max_errors=self.args.max_errors,
+        )
+        if not self.args.graph:
+            return self._create_incremental_check_use_case(check_use_case, cache)
+
+        draw_graph_use_case = self._create_draw_graph_use_case(
+            self.args.graph, self.args.graph_config, code_parser, source_files
+        )
+        return CheckAndDrawGraphUC(
+            check_use_case, draw_graph_use_case, code_parser, source_files
+        )
+
+    def _create_incremental_check_use_case(
+        self, check_use_case: CheckDependenciesUC, cache: Optional[DependencyCache]
+    ) -> Union[CheckDependenciesUC, IncrementalCheckUC]:
+        if cache is None:
+            return check_use_case
+        scope = [
+            self.args.parser,
+            str(self.args.root.absolute()),
+            *(str(path.absolute()) for path in self.args.modules),
+            # Options selecting the source files
+            f"exclude={self.get_excludes()}",
+            f"gitignore={self.args.gitignore}",
+            f"from_git={self.args.from_git}",
+            f"untracked={self.args.untracked}",
+        ]
+        result_store = CheckResultStore(cache, check_use_case.configuration, scope)
+        changed_files = None
+        if self.args.changed_files:
+            changed_files = changed_source_files(
+                read_changed_paths(self.args.changed_files),
+                self.args.modules,
+                self.args.root,
+                ExcludePatterns(self.get_excludes()),
+                gitignore=self.args.gitignore,
+            )
+        return IncrementalCheckUC(check_use_case, result_store, changed_files)
+
+    def _create_draw_graph_use_case(
+        self,
+        output: str,
+        config_path: Optional[str],
+        code_parser: IParser,
+        source_files: Iterator[SourceFile],
+    ) -> DrawGraphUC:
+        graph_conf = read_graph_config(config_path) if config_path else None
+        graph = Graph(
+            output,
+            graph_conf,
+            layout_engine=self.args.layout_engine,
+            render_timeout=self.args.render_timeout,
+            keep_dot=self.args.keep_dot,
+        )
+        graph_drawer = GraphDrawer(graph, render_cache=not self.args.no_cache)
+        return DrawGraphUC(graph_drawer, code_parser, source_files, graph_conf)
 
     def create_graph_use_case(self) -> DrawGraphUC:
         """
         Plumbing to make draw_graph use case working.
         """
-        graph_conf = read_graph_config(self.args.config) if self.args.config else None
-
-        code_parser = PythonParser()
-        source_files = source_file_iterator(self.args.modules, self.args.root)
-        graph = Graph(self.args.output, graph_conf)
-        graph_drawer = GraphDrawer(graph)
-        return DrawGraphUC(graph_drawer, code_parser, source_files, graph_conf)
+        code_parser = self.create_code_parser(self.create_cache())
+        source_files = self.create_source_files()
+        return self._create_draw_graph_use_case(
+            self.args.output, self.args.config, code_parser, source_files
+        )
 
 
 DEP_CHECK_FEATURES = {
@@ -198,6 +552,9 @@ def main() -> None:
         MainApp().main()
     except ForbiddenError:
         sys.exit(1)
+    except (GitListingError, GraphRenderError) as error:
+        logging.error(error)
+        sys.exit(2)
     except MissingOptionError:
         logging.error(
             "You have to write which feature you want to use among [build,check,graph]"
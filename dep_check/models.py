@@ -2,30 +2,74 @@
 Define all the business models of the application.
 """
 
+import importlib.util
+import sys
 from dataclasses import dataclass, field
-from typing import Dict, FrozenSet, Iterator, List, NewType, Tuple
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NewType,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
 from ordered_set import OrderedSet
 
 Module = NewType("Module", str)
 
 
-@dataclass(frozen=True)
+# Shared by all the dependencies without sub imports
+_NO_SUB_IMPORTS: FrozenSet[Module] = frozenset()
+
+
+@dataclass(frozen=True, init=False)
 class Dependency:
     """
     A complete information about a dependency
 
     With 'from a import b, c', main_import = 'a' and sub_imports = {b, c}
     With 'import e', main_import = 'e' and sub_imports = {}
+
+    A project holds millions of them: they have no __dict__, and the module
+    names are interned, so that each name is stored once.
     """
 
-    main_import: Module = Module("")
-    sub_imports: FrozenSet[Module] = field(default_factory=frozenset)
+    __slots__ = ("main_import", "sub_imports")
+
+    main_import: Module
+    sub_imports: FrozenSet[Module]
+
+    def __init__(
+        self,
+        main_import: Module = Module(""),
+        sub_imports: FrozenSet[Module] = _NO_SUB_IMPORTS,
+    ) -> None:
+        object.__setattr__(self, "main_import", Module(sys.intern(main_import)))
+        object.__setattr__(
+            self,
+            "sub_imports",
+            (
+                frozenset(Module(sys.intern(module)) for module in sub_imports)
+                if sub_imports
+                else _NO_SUB_IMPORTS
+            ),
+        )
+
+    def __reduce__(self) -> Tuple[Type["Dependency"], Tuple[Module, FrozenSet[Module]]]:
+        # The frozen __setattr__ prevents the default unpickling of slots
+        return (Dependency, (self.main_import, self.sub_imports))
 
 
 Dependencies = OrderedSet[Dependency]
 
 SourceCode = NewType("SourceCode", str)
+# Content of a source file, as decoded code, or raw bytes
+SourceContent = Union[SourceCode, bytes]
 
 ModuleWildcard = NewType("ModuleWildcard", str)
 
@@ -71,10 +115,79 @@ def iter_all_modules(global_dep: GlobalDependencies) -> Iterator[Module]:
 class SourceFile:
     """
     A complete information about a source file.
+
+    Its content is usually kept as read from the file: the code is only
+    decoded on demand, following the encoding declared in the file (PEP 263).
     """
 
     module: Module
-    code: SourceCode
+    content: SourceContent
+    path: Optional[str] = None
+
+    @property
+    def code(self) -> SourceCode:
+        """
+        The decoded source code, with universal newlines.
+        """
+        if isinstance(self.content, str):
+            return self.content
+        return SourceCode(importlib.util.decode_source(self.content))
+
+    @property
+    def size(self) -> int:
+        """
+        The size of the source file, in bytes.
+        """
+        if isinstance(self.content, str):
+            return len(self.content.encode("utf-8", "surrogatepass"))
+        return len(self.content)
+
+
+@dataclass
+class ChangedSourceFiles:
+    """
+    The source files changed since a previous run, and the removed modules.
+    """
+
+    source_files: Iterable[SourceFile]
+    removed_modules: List[Module]
+
+
+@dataclass(frozen=True)
+class SourceDependencies:
+    """
+    The dependencies of a source file, extracted from a single scan.
+
+    With 'from a import b, c', import_from_dependencies holds a with {b, c},
+    while dependencies only holds a.
+
+    This is the record streamed from the scan to the use cases: it does not
+    hold the source code, so that memory is only proportional to the
+    dependency graph. The path and size of the file are kept for reports, but
+    are not compared.
+    """
+
+    module: Module
+    import_from_dependencies: Dependencies
+    path: Optional[str] = field(default=None, compare=False)
+    size: int = field(default=0, compare=False)
+
+    @classmethod
+    def from_source_file(
+        cls, source_file: SourceFile, import_from_dependencies: Dependencies
+    ) -> "SourceDependencies":
+        return cls(
+            source_file.module,
+            import_from_dependencies,
+            source_file.path,
+            source_file.size,
+        )
+
+    @property
+    def dependencies(self) -> Dependencies:
+        return OrderedSet(
+            [Dependency(d.main_import) for d in self.import_from_dependencies]
+        )
 
 
 @dataclass(frozen=True)
@@ -5,7 +5,7 @@ Build rules more restrictive rules from existing source use case.
 from abc import ABC, abstractmethod
 from typing import Dict, Iterator
 
-from dep_check.dependency_finder import IParser, get_dependencies
+from dep_check.dependency_finder import IParser, iter_source_dependencies
 from dep_check.models import Dependencies, Module, ModuleWildcard, SourceFile
 
 from .app_configuration import AppConfigurationSingleton
@@ -46,11 +46,10 @@ class BuildConfigurationUC:
         Build configuration from existing source files.
         """
         global_dependencies: Dict[Module, Dependencies] = {}
-        for source_file in self.source_files:
-            dependencies = get_dependencies(source_file, self.parser)
-            dependencies = self.std_lib_filter.filter(dependencies)
+        for source in iter_source_dependencies(self.source_files, self.parser):
+            dependencies = self.std_lib_filter.filter(source.dependencies)
 
-            global_dependencies[source_file.module] = dependencies
+            global_dependencies[source.module] = dependencies
 
         dependency_rules = {}
         for module, dependencies in global_dependencies.items():
@@ -2,23 +2,30 @@
 Check all given source files dependencies use case.
 """
 
-import re
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Iterator, List, Tuple
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from ordered_set import OrderedSet
 
-from dep_check.checker import NotAllowedDependencyException, check_dependency
-from dep_check.dependency_finder import IParser, get_import_from_dependencies
+from dep_check.checker import (
+    CompiledRules,
+    NotAllowedDependencyException,
+    RuleCompiler,
+    check_dependency,
+)
+from dep_check.dependency_finder import IParser, iter_source_dependencies
 from dep_check.models import (
     MatchingRule,
     MatchingRules,
     Module,
     ModuleWildcard,
+    Rule,
     Rules,
+    SourceDependencies,
     SourceFile,
 )
+from dep_check.wildcard_index import WildcardIndex, WildcardMatch
 
 from .app_configuration import AppConfigurationSingleton
 from .interfaces import Configuration, UnusedLevel
@@ -39,12 +46,13 @@ class ForbiddenDepencyError(ForbiddenError):
 @dataclass(frozen=True)
 class DependencyError:
     """
-    Dataclass representing a dependency error.
+    Dataclass representing a dependency error, in the source file at path.
     """
 
     module: Module
     dependency: Module
     rules: Tuple[ModuleWildcard, ...]
+    path: Optional[str] = None
 
 
 class IReportPrinter(ABC):
@@ -61,93 +69,278 @@ class IReportPrinter(ABC):
         """
 
 
+class IReporter(ABC):
+    """
+    Streaming errors reporter interface, notified as source files are checked.
+    """
+
+    @abstractmethod
+    def begin(self) -> None:
+        """
+        Start a report, before checking the first source file
+        """
+
+    @abstractmethod
+    def on_error(self, error: DependencyError) -> None:
+        """
+        Report a dependency error of the source file being checked
+        """
+
+    @abstractmethod
+    def on_file_done(
+        self, module: Module, used_rules: Tuple[Rule, ...], path: Optional[str] = None
+    ) -> None:
+        """
+        Notify that a source file (at path, if known) has been checked, after
+        its errors, along with the rules its dependencies matched
+        """
+
+    @abstractmethod
+    def end(self, unused_rules: Rules, nb_files: int) -> None:
+        """
+        End the report, once all source files are checked
+        """
+
+
+class SummaryReporter(IReporter):
+    """
+    Reporter collecting all the errors, to print them at once with a report
+    printer.
+    """
+
+    def __init__(self, report_printer: IReportPrinter) -> None:
+        self.report_printer = report_printer
+        self.errors: List[DependencyError] = []
+
+    def begin(self) -> None:
+        self.errors = []
+
+    def on_error(self, error: DependencyError) -> None:
+        self.errors.append(error)
+
+    def on_file_done(
+        self, module: Module, used_rules: Tuple[Rule, ...], path: Optional[str] = None
+    ) -> None:
+        pass
+
+    def end(self, unused_rules: Rules, nb_files: int) -> None:
+        self.report_printer.print_report(self.errors, unused_rules, nb_files)
+
+
+@dataclass(frozen=True)
+class ModuleResult:
+    """
+    Dataclass representing the result of checking a single module.
+    """
+
+    errors: Tuple[DependencyError, ...] = ()
+    used_rules: Tuple[Rule, ...] = ()
+    path: Optional[str] = None
+
+
+ResolutionSignature = Tuple[WildcardMatch, ...]
+
+
+class MatchingRulesResolver:
+    """
+    Resolve the configuration rules matching a module.
+
+    Module wildcards are indexed once, and modules with the same resolution
+    signature (matching wildcards and values of their named groups) share the
+    same MatchingRules, which must therefore not be mutated.
+    """
+
+    def __init__(self, configuration: Configuration, parser: IParser) -> None:
+        self.rule_compiler = RuleCompiler(parser)
+        self._module_wildcards = [
+            ModuleWildcard(module_wildcard)
+            for module_wildcard in configuration.dependency_rules
+        ]
+        self._rules = list(configuration.dependency_rules.values())
+        self._index = WildcardIndex(parser, self._module_wildcards)
+        self._matching_rules: Dict[ResolutionSignature, MatchingRules] = {}
+        self._compiled_rules: Dict[ResolutionSignature, CompiledRules] = {}
+
+    def _get_signature(self, module: Module) -> ResolutionSignature:
+        return tuple(self._index.match(module))
+
+    def _resolve(self, signature: ResolutionSignature) -> MatchingRules:
+        if signature in self._matching_rules:
+            return self._matching_rules[signature]
+
+        matching_rules: MatchingRules = OrderedSet()
+        for index, groups in signature:
+            module_wildcard = self._module_wildcards[index]
+            groupdict = dict(groups)
+            matching_rules.update(
+                [
+                    MatchingRule(
+                        module_wildcard=module_wildcard,
+                        original_rule_wildcard=r,
+                        specific_rule_wildcard=(
+                            ModuleWildcard(r.format_map(groupdict))
+                            if "{" in r or "}" in r
+                            else r
+                        ),
+                    )
+                    for r in self._rules[index]
+                ]
+            )
+        self._matching_rules[signature] = matching_rules
+        return matching_rules
+
+    def get_rules(self, module: Module) -> MatchingRules:
+        """
+        Return rules in configuration that match a given module.
+        """
+        return self._resolve(self._get_signature(module))
+
+    def get_compiled_rules(self, module: Module) -> CompiledRules:
+        """
+        Return the compiled rules in configuration that match a given module.
+        """
+        signature = self._get_signature(module)
+        if signature not in self._compiled_rules:
+            self._compiled_rules[signature] = self.rule_compiler.compile(
+                self._resolve(signature)
+            )
+        return self._compiled_rules[signature]
+
+
 class CheckDependenciesUC:
     """
     Dependency check use case.
 
     In this use case, we ensure that all given source files respect
     all rules that matching their module name.
+
+    With a maximum number of errors, the check stops once it is reached.
     """
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         configuration: Configuration,
-        report_printer: IReportPrinter,
+        report_printer: Union[IReportPrinter, IReporter],
         parser: IParser,
         source_files: Iterator[SourceFile],
+        *,
+        max_errors: Optional[int] = None,
     ):
         app_configuration = AppConfigurationSingleton.get_instance()
         self.std_lib_filter = app_configuration.std_lib_filter
         self.configuration = configuration
         self.report_printer = report_printer
+        self.reporter = (
+            report_printer
+            if isinstance(report_printer, IReporter)
+            else SummaryReporter(report_printer)
+        )
         self.parser = parser
         self.source_files = source_files
+        self.max_errors = max_errors
+        self.rules_resolver = MatchingRulesResolver(configuration, parser)
         self.used_rules: Rules = OrderedSet()
 
     def _get_rules(self, module: Module) -> MatchingRules:
         """
         Return rules in configuration that match a given module.
         """
-        matching_rules: MatchingRules = OrderedSet()
-        for module_wildcard, rules in self.configuration.dependency_rules.items():
-            match = re.match(
-                f"{self.parser.wildcard_to_regex(ModuleWildcard(module_wildcard)).regex}$",
-                module,
-            )
-            if match:
-                matching_rules.update(
-                    [
-                        MatchingRule(
-                            module_wildcard=ModuleWildcard(module_wildcard),
-                            original_rule_wildcard=r,
-                            specific_rule_wildcard=ModuleWildcard(
-                                r.format_map(match.groupdict())
-                            ),
-                        )
-                        for r in rules
-                    ]
-                )
+        return self.rules_resolver.get_rules(module)
 
-        return matching_rules
-
-    def _iter_error(self, source_file: SourceFile) -> Iterator[DependencyError]:
-        matching_rules = self._get_rules(source_file.module)
-        dependencies = get_import_from_dependencies(source_file, self.parser)
-        dependencies = self.std_lib_filter.filter(dependencies)
+    def _iter_error(
+        self, source_dependencies: SourceDependencies, used_rules: Rules
+    ) -> Iterator[DependencyError]:
+        module = source_dependencies.module
+        matching_rules = self.rules_resolver.get_compiled_rules(module)
+        dependencies = self.std_lib_filter.filter(
+            source_dependencies.import_from_dependencies
+        )
         for dependency in dependencies:
             try:
-                self.used_rules |= {
+                used_rules |= {
                     r.original_rule
                     for r in check_dependency(self.parser, dependency, matching_rules)
                 }
             except NotAllowedDependencyException as error:
                 yield DependencyError(
-                    source_file.module,
+                    module,
                     error.dependency,
                     tuple(sorted(error.authorized_modules)),
+                    source_dependencies.path,
                 )
 
+    def check_module(self, source_dependencies: SourceDependencies) -> ModuleResult:
+        """
+        Check the dependencies of a single module.
+        """
+        used_rules: Rules = OrderedSet()
+        errors = tuple(self._iter_error(source_dependencies, used_rules))
+        return ModuleResult(errors, tuple(used_rules), source_dependencies.path)
+
     def run(self) -> None:
-        errors = []
-        nb_files = 0
+        self.check(iter_source_dependencies(self.source_files, self.parser))
 
-        for source_file in self.source_files:
-            nb_files += 1
-            for error in self._iter_error(source_file):
-                errors.append(error)
+    def check(self, source_dependencies: Iterable[SourceDependencies]) -> None:
+        """
+        Check dependencies already extracted from the source files.
+        """
+        self.report((d.module, self.check_module(d)) for d in source_dependencies)
+
+    def _limit_errors(
+        self, results: Iterable[Tuple[Module, ModuleResult]]
+    ) -> Iterator[Tuple[Module, ModuleResult]]:
+        """
+        Stop consuming the results, and thus checking source files, as soon as
+        the maximum number of errors is reached.
+        """
+        max_errors = self.max_errors
+        nb_errors = 0
+        for module, result in results:
+            if max_errors:
+                result = replace(result, errors=result.errors[: max_errors - nb_errors])
+                nb_errors += len(result.errors)
+            yield module, result
+            if max_errors and nb_errors >= max_errors:
+                return
+
+    def _get_unused_rules(self, nb_errors: int) -> Rules:
+        """
+        Return the rules not used by the checked modules, none if ignored or
+        if the check stopped on errors (they are unknown then).
+        """
+        max_errors = self.max_errors
+        if self.configuration.unused_level == UnusedLevel.IGNORE.value or (
+            max_errors and nb_errors >= max_errors
+        ):
+            return OrderedSet()
 
         all_rules: Rules = OrderedSet(
             (ModuleWildcard(wildcard), rule)
             for wildcard, rules in self.configuration.dependency_rules.items()
             for rule in rules
         )
+        return all_rules.difference(self.used_rules)
+
+    def report(self, results: Iterable[Tuple[Module, ModuleResult]]) -> None:
+        """
+        Report the errors and unused rules of checked modules, one per file,
+        as they come.
+        """
+        self.reporter.begin()
+        nb_files = 0
+        nb_errors = 0
+        for module, result in self._limit_errors(results):
+            nb_files += 1
+            nb_errors += len(result.errors)
+            for error in result.errors:
+                self.reporter.on_error(error)
+            self.used_rules.update(result.used_rules)
+            self.reporter.on_file_done(module, result.used_rules, result.path)
 
-        unused: Rules = OrderedSet()
-        if self.configuration.unused_level != UnusedLevel.IGNORE.value:
-            unused = all_rules.difference(self.used_rules)
-        self.report_printer.print_report(errors, unused, nb_files)
+        unused = self._get_unused_rules(nb_errors)
+        self.reporter.end(unused, nb_files)
 
-        if errors:
+        if nb_errors:
             raise ForbiddenDepencyError
 
         if self.configuration.unused_level == UnusedLevel.ERROR.value and unused:
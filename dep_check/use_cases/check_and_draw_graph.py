@@ -0,0 +1,63 @@
+"""
+Check all given source files dependencies and draw their graph, in a single scan.
+"""
+
+from collections import deque
+from typing import Iterable, Iterator, List
+
+from dep_check.dependency_finder import IParser, iter_source_dependencies
+from dep_check.models import SourceDependencies, SourceFile
+
+from .check import CheckDependenciesUC, ForbiddenError
+from .draw_graph import DrawGraphUC
+
+
+class CheckAndDrawGraphUC:
+    """
+    Check and draw graph use cases, sharing a single scan of the source files.
+
+    The graph is drawn even if the check fails, from all the source files:
+    those the check did not read, once it stopped on errors, are scanned too.
+    """
+
+    def __init__(
+        self,
+        check_use_case: CheckDependenciesUC,
+        draw_graph_use_case: DrawGraphUC,
+        parser: IParser,
+        source_files: Iterable[SourceFile],
+    ) -> None:
+        self.check_use_case = check_use_case
+        self.draw_graph_use_case = draw_graph_use_case
+        self.parser = parser
+        self.source_files = source_files
+
+    @staticmethod
+    def _iter_and_collect(
+        source_dependencies: Iterable[SourceDependencies],
+        collected: List[SourceDependencies],
+    ) -> Iterator[SourceDependencies]:
+        for dependencies in source_dependencies:
+            collected.append(dependencies)
+            yield dependencies
+
+    def _draw(
+        self,
+        source_dependencies: Iterator[SourceDependencies],
+        collected: List[SourceDependencies],
+    ) -> None:
+        # Collect the source files left unread by a check stopped on errors
+        deque(source_dependencies, maxlen=0)
+        self.draw_graph_use_case.draw(collected)
+
+    def run(self) -> None:
+        collected: List[SourceDependencies] = []
+        source_dependencies = self._iter_and_collect(
+            iter_source_dependencies(self.source_files, self.parser), collected
+        )
+        try:
+            self.check_use_case.check(source_dependencies)
+        except ForbiddenError:
+            self._draw(source_dependencies, collected)
+            raise
+        self._draw(source_dependencies, collected)
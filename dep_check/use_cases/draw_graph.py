@@ -2,23 +2,26 @@
 Draws a graph of the dependencies between modules
 """
 
+import re
 from abc import ABC, abstractmethod
-from collections import defaultdict
-from typing import Dict, Iterator, Optional
+from typing import Dict, Iterable, Iterator, Optional
 
 from ordered_set import OrderedSet
 
-from dep_check.dependency_finder import IParser, get_dependencies
+from dep_check.dependency_finder import IParser, iter_source_dependencies
 from dep_check.models import (
-    Dependencies,
     Dependency,
     GlobalDependencies,
     Module,
+    SourceDependencies,
     SourceFile,
 )
 
 from .app_configuration import AppConfigurationSingleton
 
+# Separators of a module from its sub-modules (`/` for golang packages)
+_SEPARATORS = re.compile(r"[./]")
+
 
 class IGraphDrawer(ABC):
     """
@@ -32,22 +35,64 @@ class IGraphDrawer(ABC):
         """
 
 
-def _fold_dep(
-    global_dep: GlobalDependencies, fold_module: Module
+def _iter_module_and_parents(module: Module) -> Iterator[Module]:
+    """
+    Iterate over the parents of a module, from the top-level one, and the
+    module itself: `a`, `a.b`, `a.b.c`.
+    """
+    for separator in _SEPARATORS.finditer(module):
+        yield Module(module[: separator.start()])
+    yield module
+
+
+class _ModuleResolver:
+    """
+    Resolve each module of the graph to the node representing it: the
+    outermost folded module containing it, or None if it is hidden.
+
+    A module contains its sub-modules, on dotted boundaries: `a.b` contains
+    `a.b.c`, but not `a.bc`. Each module is only resolved once.
+    """
+
+    def __init__(
+        self, fold_modules: Iterable[Module], hide_modules: Iterable[Module]
+    ) -> None:
+        self.fold_modules = frozenset(filter(None, fold_modules))
+        self.hide_modules = frozenset(filter(None, hide_modules))
+        self._nodes: Dict[Module, Optional[Module]] = {}
+
+    def _resolve(self, module: Module) -> Optional[Module]:
+        modules = list(_iter_module_and_parents(module))
+        if self.hide_modules.intersection(modules):
+            return None
+        return next((m for m in modules if m in self.fold_modules), module)
+
+    def resolve(self, module: Module) -> Optional[Module]:
+        if module not in self._nodes:
+            self._nodes[module] = self._resolve(module)
+        return self._nodes[module]
+
+
+def _rewrite_graph(
+    global_dep: GlobalDependencies, resolver: _ModuleResolver
 ) -> GlobalDependencies:
-    fold_global_dep: GlobalDependencies = defaultdict(OrderedSet)
+    """
+    Fold and hide the modules of a graph, in a single pass over its edges.
+    Edges from a node to itself, and nodes left without edges, are dropped.
+    """
+    rewritten_dep: GlobalDependencies = {}
     for module, deps in global_dep.items():
-        new_deps: Dependencies = OrderedSet()
-        if module.startswith(tuple((f"{fold_module}.", f"{fold_module}/"))):
-            module = fold_module
-        fold_dep = OrderedSet(
-            Dependency(fold_module) if dep.main_import.startswith(fold_module) else dep
-            for dep in deps
-        )
-        new_deps |= fold_dep
-        fold_global_dep[module] |= new_deps
+        node = resolver.resolve(module)
+        if node is None:
+            continue
+        node_deps = rewritten_dep.setdefault(node, OrderedSet())
+        for dep in deps:
+            dep_node = resolver.resolve(dep.main_import)
+            if dep_node is None or dep_node == node:
+                continue
+            node_deps.add(dep if dep_node == dep.main_import else Dependency(dep_node))
 
-    return fold_global_dep
+    return {module: deps for module, deps in rewritten_dep.items() if deps}
 
 
 class DrawGraphUC:
@@ -65,40 +110,23 @@ class DrawGraphUC:
         self.parser = parser
         self.config = config or {}
 
-    def _hide(self, global_dep: GlobalDependencies) -> GlobalDependencies:
-        hide_modules = tuple(self.config.get("hide_modules", ()))
-        if not hide_modules:
-            return global_dep
-
-        filtered_global_dep = {}
-        for module, dependencies in global_dep.items():
-            if not module.startswith(hide_modules):
-                filtered_global_dep[module] = OrderedSet(
-                    dependency
-                    for dependency in dependencies
-                    if not dependency.main_import.startswith(hide_modules)
-                )
-
-        return filtered_global_dep
+    def _rewrite(self, global_dep: GlobalDependencies) -> GlobalDependencies:
+        resolver = _ModuleResolver(
+            self.config.get("fold_modules", ()), self.config.get("hide_modules", ())
+        )
+        return _rewrite_graph(global_dep, resolver)
 
     def run(self) -> None:
+        self.draw(iter_source_dependencies(self.source_files, self.parser))
+
+    def draw(self, source_dependencies: Iterable[SourceDependencies]) -> None:
+        """
+        Draw the graph of dependencies already extracted from the source files.
+        """
         global_dependencies: GlobalDependencies = {}
-        for source_file in self.source_files:
-            module = Module(source_file.module.replace(".__init__", ""))
-            dependencies = get_dependencies(source_file, self.parser)
-            dependencies = self.std_lib_filter.filter(dependencies)
+        for source in source_dependencies:
+            module = Module(source.module.replace(".__init__", ""))
+            dependencies = self.std_lib_filter.filter(source.dependencies)
             global_dependencies[module] = dependencies
 
-        global_dependencies = self._hide(global_dependencies)
-
-        for fold_module in self.config.get("fold_modules", []):
-            global_dependencies = _fold_dep(global_dependencies, fold_module)
-
-        # To avoid a module to point itself, and make the graph more readable
-        for module, deps in list(global_dependencies.items()):
-            deps -= {dep for dep in deps if dep.main_import == module}
-
-            if not global_dependencies[module]:
-                global_dependencies.pop(module, None)
-
-        self.drawer.write(global_dependencies)
+        self.drawer.write(self._rewrite(global_dependencies))
@@ -0,0 +1,136 @@
+"""
+Check only the source files changed since a previous check use case.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import closing
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from dep_check.dependency_finder import iter_source_dependencies
+from dep_check.models import ChangedSourceFiles, Module, SourceFile
+
+from .check import CheckDependenciesUC, ModuleResult
+
+ModuleResults = Dict[Module, ModuleResult]
+
+# Number of module results stored at once, during a check of all modules
+_STORE_BATCH = 1000
+
+
+class ICheckResultStore(ABC):
+    """
+    Interface for storing the check result of each module, between runs.
+    """
+
+    @abstractmethod
+    def read(self) -> Optional[ModuleResults]:
+        """
+        Read the results of the previous check, None if there is none.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Forget the stored results, before storing those of a check of all
+        modules, by batches.
+        """
+
+    @abstractmethod
+    def update(self, results: ModuleResults, removed_modules: Iterable[Module]) -> None:
+        """
+        Store the results of the changed modules, and forget the removed ones.
+        """
+
+    @abstractmethod
+    def complete(self) -> None:
+        """
+        Mark the stored results as those of a check of all modules: they are
+        not read back before.
+        """
+
+
+class IncrementalCheckUC:
+    """
+    Incremental dependency check use case.
+
+    Only the changed source files are checked, the results of the other modules
+    are read from the previous check. Unused rules are still reported over all
+    modules, since the rules used by each module are stored along its errors.
+
+    Without changed source files, or any previous result, all source files are
+    checked. Their results are not stored if the check may stop on errors.
+
+    Each checked source file is reported as soon as it is checked, and its
+    result stored afterwards.
+    """
+
+    def __init__(
+        self,
+        check_use_case: CheckDependenciesUC,
+        result_store: ICheckResultStore,
+        changed_files: Optional[ChangedSourceFiles] = None,
+    ) -> None:
+        self.check_use_case = check_use_case
+        self.result_store = result_store
+        self.changed_files = changed_files
+
+    def _iter_check(
+        self, source_files: Iterable[SourceFile]
+    ) -> Iterator[Tuple[Module, ModuleResult]]:
+        for source in iter_source_dependencies(
+            source_files, self.check_use_case.parser
+        ):
+            yield source.module, self.check_use_case.check_module(source)
+
+    def _iter_full(self) -> Iterator[Tuple[Module, ModuleResult]]:
+        """
+        Check all source files, and store their results by batches, once they
+        are reported.
+        """
+        self.result_store.clear()
+        batch: ModuleResults = {}
+        for module, result in self._iter_check(self.check_use_case.source_files):
+            yield module, result
+            batch[module] = result
+            if len(batch) >= _STORE_BATCH:
+                self.result_store.update(batch, [])
+                batch = {}
+        self.result_store.update(batch, [])
+        self.result_store.complete()
+
+    def _iter_incremental(
+        self, changed_files: ChangedSourceFiles, results: ModuleResults
+    ) -> Iterator[Tuple[Module, ModuleResult]]:
+        """
+        Check the changed source files, then yield the stored results of the
+        other modules.
+
+        If the report stops early, on errors, the remaining changed source
+        files are still checked, so that no outdated result is left stored.
+        """
+        changed_results: ModuleResults = {}
+        checked = self._iter_check(changed_files.source_files)
+        try:
+            for module, result in checked:
+                changed_results[module] = result
+                yield module, result
+        except GeneratorExit:
+            changed_results.update(checked)
+            self.result_store.update(changed_results, changed_files.removed_modules)
+            raise
+        self.result_store.update(changed_results, changed_files.removed_modules)
+        for module in [*changed_files.removed_modules, *changed_results]:
+            results.pop(module, None)
+        yield from results.items()
+
+    def run(self) -> None:
+        results = self.result_store.read() if self.changed_files else None
+        if self.changed_files is not None and results is not None:
+            incremental_results = self._iter_incremental(self.changed_files, results)
+            with closing(incremental_results):
+                self.check_use_case.report(incremental_results)
+        elif self.check_use_case.max_errors:
+            # A check stopped early cannot be stored
+            self.check_use_case.run()
+        else:
+            self.check_use_case.report(self._iter_full())
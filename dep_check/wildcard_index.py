@@ -0,0 +1,132 @@
+"""
+Index module wildcards, to find those matching a module without testing them all.
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from dep_check.dependency_finder import IParser
+from dep_check.models import Module, ModuleWildcard, RegexRule
+
+Groups = Tuple[Tuple[str, Optional[str]], ...]
+WildcardMatch = Tuple[int, Groups]
+
+_SPECIAL_CHARS = frozenset("*?[]()%{}\\|^$+~")
+_SUFFIX_REGEXES = {"": "", "*": ".*", "%": r"(\..*)?$"}
+
+
+def _merge_patterns(regexes: Iterable[str]) -> Optional[Pattern[str]]:
+    """
+    Merge regexes into a single alternation, None if they cannot be merged
+    (e.g. the same named group is used twice).
+    """
+    alternation = "|".join(f"(?:{regex}$)" for regex in regexes)
+    try:
+        return re.compile(alternation) if alternation else None
+    except re.error:
+        return None
+
+
+def _split_plain_wildcard(
+    wildcard: ModuleWildcard, regex_rule: RegexRule
+) -> Optional[Tuple[str, str]]:
+    """
+    Split a wildcard made of a dotted name followed by an optional `%` or `*`
+    into this name and its suffix. Return None for any other wildcard.
+    """
+    body = wildcard[1:] if wildcard.startswith("~") else wildcard
+    suffix = body[-1:] if body[-1:] in ("%", "*") else ""
+    name = body[: len(body) - len(suffix)]
+    if _SPECIAL_CHARS.intersection(name):
+        return None
+
+    # Only trust the shape if the parser translates it the usual way
+    expected_regex = name.replace(".", "\\.") + _SUFFIX_REGEXES[suffix]
+    return (name, suffix) if regex_rule.regex == expected_regex else None
+
+
+class _Node:
+    """
+    A node of the wildcard trie, for a given dotted path.
+    """
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        # Wildcards matching exactly this path
+        self.exact: List[int] = []
+        # Wildcards matching this path and all its sub-modules (`path%`)
+        self.subtree: List[int] = []
+        # Wildcards matching sub-modules starting with a prefix (`path.prefix*`)
+        self.prefixes: List[Tuple[str, int]] = []
+
+    def get_node(self, components: List[str]) -> "_Node":
+        node = self
+        for component in components:
+            node = node.children.setdefault(component, _Node())
+        return node
+
+
+class WildcardIndex:
+    """
+    Find which wildcards, among a list, match a given module.
+
+    Wildcards made of a dotted name, optionally followed by `%` or `*`, are
+    stored in a trie walked along the module components. The other ones
+    (`?`, `[!..]`, named groups...) fall back to a regex match.
+    """
+
+    def __init__(self, parser: IParser, wildcards: Iterable[ModuleWildcard]) -> None:
+        self._root = _Node()
+        self._fallback: List[Tuple[int, Pattern[str]]] = []
+        fallback_regexes = []
+        for index, wildcard in enumerate(wildcards):
+            regex_rule = parser.wildcard_to_regex(wildcard)
+            plain_wildcard = _split_plain_wildcard(wildcard, regex_rule)
+            if plain_wildcard:
+                self._add(index, *plain_wildcard)
+            else:
+                self._fallback.append((index, re.compile(f"{regex_rule.regex}$")))
+                fallback_regexes.append(regex_rule.regex)
+        self._fallback_regex = _merge_patterns(fallback_regexes)
+
+    def _add(self, index: int, name: str, suffix: str) -> None:
+        components = name.split(".")
+        if suffix == "*":
+            prefix = components.pop()
+            self._root.get_node(components).prefixes.append((prefix, index))
+        elif suffix == "%":
+            self._root.get_node(components).subtree.append(index)
+        else:
+            self._root.get_node(components).exact.append(index)
+
+    def _walk(self, module: Module) -> Iterator[int]:
+        node = self._root
+        for component in module.split("."):
+            yield from node.subtree
+            yield from (
+                i for prefix, i in node.prefixes if component.startswith(prefix)
+            )
+            if component not in node.children:
+                break
+            node = node.children[component]
+        else:
+            yield from node.subtree
+            yield from node.exact
+
+    def _iter_fallback(self, module: Module) -> Iterator[WildcardMatch]:
+        if self._fallback_regex is not None and not self._fallback_regex.match(module):
+            return
+        for index, pattern in self._fallback:
+            match = pattern.match(module)
+            if match:
+                yield index, tuple(match.groupdict().items())
+
+    def match(self, module: Module) -> List[WildcardMatch]:
+        """
+        Return the indexes of the wildcards matching the module, in their
+        original order, along with the values of their named groups.
+        """
+        matches: List[WildcardMatch] = [(index, ()) for index in self._walk(module)]
+        if self._fallback:
+            matches.extend(self._iter_fallback(module))
+        return sorted(matches)
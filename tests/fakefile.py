@@ -4,7 +4,7 @@ from dep_check.models import Dependency, Module, SourceCode, SourceFile
 
 SIMPLE_FILE = SourceFile(
     module=Module("simple_module"),
-    code=SourceCode("""
+    content=SourceCode("""
 import module
 import module.inside.module
 from amodule import aclass
@@ -12,7 +12,7 @@ from amodule import aclass
 )
 FILE_WITH_LOCAL_IMPORT = SourceFile(
     module=Module("amodule.local_module"),
-    code=SourceCode("""
+    content=SourceCode("""
 import module
 import module.inside.module
 from . import aclass
@@ -21,7 +21,7 @@ from .inside import aclass
 )
 FILE_WITH_STD_IMPORT = SourceFile(
     module=Module("amodule.std_module"),
-    code=SourceCode("""
+    content=SourceCode("""
 import module
 import module.inside.module
 import itertools
@@ -0,0 +1,317 @@
+"""
+Test dependencies cache.
+"""
+
+import sqlite3
+from typing import Iterable, Iterator, List
+from unittest.mock import Mock, patch
+
+from dep_check.infra.cache import CachedParser, CheckResultStore, DependencyCache
+from dep_check.infra.process_pool import ProcessPoolParser
+from dep_check.infra.python_parser import PythonLexerParser, PythonParser
+from dep_check.models import (
+    Module,
+    ModuleWildcard,
+    SourceCode,
+    SourceDependencies,
+    SourceFile,
+)
+from dep_check.use_cases.check import DependencyError, ModuleResult
+from dep_check.use_cases.interfaces import Configuration
+
+from .fakefile import FILE_WITH_LOCAL_IMPORT, SIMPLE_FILE
+
+PARSER = PythonParser()
+
+
+def test_cache_hit(tmp_path) -> None:
+    """
+    Test that an unchanged source file is only parsed once, across runs.
+    """
+    # Given
+    parser = Mock(wraps=PARSER)
+
+    # When
+    with DependencyCache(tmp_path) as cache:
+        first = CachedParser(parser, cache).find_source_dependencies(SIMPLE_FILE)
+    with DependencyCache(tmp_path) as cache:
+        second = CachedParser(parser, cache).find_source_dependencies(SIMPLE_FILE)
+
+    # Then
+    assert parser.find_import_from_dependencies.call_count == 1
+    assert first == second
+    assert list(second.import_from_dependencies) == list(
+        PARSER.find_import_from_dependencies(SIMPLE_FILE)
+    )
+    assert list(second.dependencies) == list(PARSER.find_dependencies(SIMPLE_FILE))
+
+
+def test_cache_miss_on_change(tmp_path) -> None:
+    """
+    Test that a changed source file is parsed again.
+    """
+    # Given
+    changed_file = SourceFile(
+        SIMPLE_FILE.module, SourceCode(f"{SIMPLE_FILE.code}import other\n")
+    )
+
+    # When
+    with DependencyCache(tmp_path) as cache:
+        cached_parser = CachedParser(PARSER, cache)
+        cached_parser.find_dependencies(SIMPLE_FILE)
+        dependencies = cached_parser.find_dependencies(changed_file)
+
+    # Then
+    assert dependencies == PARSER.find_dependencies(changed_file)
+
+
+def test_cache_by_parser(tmp_path) -> None:
+    """
+    Test that each parser has its own cache entries.
+    """
+    # Given
+    parser = Mock(wraps=PythonLexerParser())
+
+    # When
+    with DependencyCache(tmp_path) as cache:
+        CachedParser(PARSER, cache).find_dependencies(FILE_WITH_LOCAL_IMPORT)
+        CachedParser(parser, cache).find_dependencies(FILE_WITH_LOCAL_IMPORT)
+
+    # Then
+    parser.find_import_from_dependencies.assert_called_once()
+
+
+def test_cache_by_parser_with_jobs(
+    tmp_path, source_files: Iterable[SourceFile]
+) -> None:
+    """
+    Test that the cache entries are those of the parser scanning source files
+    over a pool of processes.
+    """
+    # Given
+    parser = Mock(wraps=PARSER)
+    lexer = Mock(wraps=PythonLexerParser())
+    pool_parser = ProcessPoolParser(PythonParser(), jobs=2, chunksize=1)
+
+    # When
+    with DependencyCache(tmp_path) as cache:
+        list(CachedParser(pool_parser, cache).iter_source_dependencies(source_files))
+    with DependencyCache(tmp_path) as cache:
+        for source_file in source_files:
+            CachedParser(parser, cache).find_dependencies(source_file)
+            CachedParser(ProcessPoolParser(lexer, jobs=2), cache).find_dependencies(
+                source_file
+            )
+
+    # Then
+    parser.find_import_from_dependencies.assert_not_called()
+    assert lexer.find_import_from_dependencies.call_count == len(source_files)
+
+
+def test_cache_invalidated_on_new_version(tmp_path) -> None:
+    """
+    Test that the cache is dropped when dep_check version changes.
+    """
+    # Given
+    parser = Mock(wraps=PARSER)
+    with DependencyCache(tmp_path) as cache:
+        CachedParser(parser, cache).find_dependencies(SIMPLE_FILE)
+
+    # When
+    with patch("dep_check.infra.cache.__version__", "0.0.0"):
+        with DependencyCache(tmp_path) as cache:
+            CachedParser(parser, cache).find_dependencies(SIMPLE_FILE)
+
+    # Then
+    assert parser.find_import_from_dependencies.call_count == 2
+
+
+def test_cache_shared(tmp_path) -> None:
+    """
+    Test that parallel runs share the cache, without locking each other out.
+    """
+    # Given
+    parser = Mock(wraps=PARSER)
+
+    # When
+    with DependencyCache(tmp_path) as cache, DependencyCache(tmp_path) as other:
+        CachedParser(parser, cache).find_dependencies(SIMPLE_FILE)
+        CachedParser(parser, other).find_dependencies(FILE_WITH_LOCAL_IMPORT)
+    with DependencyCache(tmp_path) as cache:
+        CachedParser(parser, cache).find_dependencies(SIMPLE_FILE)
+        CachedParser(parser, cache).find_dependencies(FILE_WITH_LOCAL_IMPORT)
+
+    # Then
+    assert parser.find_import_from_dependencies.call_count == 2
+
+
+def test_cache_locked(tmp_path, caplog) -> None:
+    """
+    Test that source files are parsed without the cache, if it stays locked.
+    """
+    # Given
+    parser = Mock(wraps=PARSER)
+    with DependencyCache(tmp_path):
+        pass
+    other = sqlite3.connect(str(tmp_path / "dependencies.sqlite"))
+    other.execute("BEGIN EXCLUSIVE")
+
+    # When
+    with patch("dep_check.infra.cache._BUSY_TIMEOUT", 0.1):
+        with DependencyCache(tmp_path) as cache:
+            dependencies = CachedParser(parser, cache).find_dependencies(SIMPLE_FILE)
+    other.rollback()
+    with DependencyCache(tmp_path) as cache:
+        CachedParser(parser, cache).find_dependencies(SIMPLE_FILE)
+    other.close()
+
+    # Then
+    assert dependencies == PARSER.find_dependencies(SIMPLE_FILE)
+    assert "Dependencies cache disabled: database is locked" in caplog.text
+    assert parser.find_import_from_dependencies.call_count == 2
+
+
+def test_cache_unusable(tmp_path, caplog) -> None:
+    """
+    Test that source files are parsed without the cache, if it cannot be opened.
+    """
+    # Given
+    parser = Mock(wraps=PARSER)
+    (tmp_path / "corrupt").mkdir()
+    (tmp_path / "corrupt" / "dependencies.sqlite").write_bytes(b"not a database" * 100)
+    (tmp_path / "file").write_text("", encoding="utf-8")
+
+    # When
+    with DependencyCache(tmp_path / "corrupt") as cache:
+        corrupt = CachedParser(parser, cache).find_dependencies(SIMPLE_FILE)
+    with DependencyCache(tmp_path / "file" / "cache") as cache:
+        unwritable = CachedParser(parser, cache).find_dependencies(SIMPLE_FILE)
+
+    # Then
+    assert corrupt == unwritable == PARSER.find_dependencies(SIMPLE_FILE)
+    assert "Dependencies cache disabled: file is not a database" in caplog.text
+    assert "Dependencies cache disabled: [Errno 20] Not a directory" in caplog.text
+    assert parser.find_import_from_dependencies.call_count == 2
+
+
+def test_cache_iter_in_order(tmp_path, source_files: Iterable[SourceFile]) -> None:
+    """
+    Test that only missing source files are scanned concurrently, and yielded in
+    order.
+    """
+    # Given
+    pool_parser = ProcessPoolParser(PythonParser(), jobs=2)
+    source_files = list(source_files)
+    with DependencyCache(tmp_path) as cache:
+        CachedParser(PARSER, cache).find_dependencies(source_files[1])
+    scanned: List[SourceFile] = []
+
+    def scan(source_files: Iterable[SourceFile]) -> Iterator[SourceDependencies]:
+        for source_file in source_files:
+            scanned.append(source_file)
+            yield PARSER.find_source_dependencies(source_file)
+
+    # When
+    with patch.object(pool_parser, "iter_source_dependencies", scan):
+        with DependencyCache(tmp_path) as cache:
+            source_dependencies = list(
+                CachedParser(pool_parser, cache).iter_source_dependencies(source_files)
+            )
+
+    # Then
+    assert source_dependencies == list(PARSER.iter_source_dependencies(source_files))
+    assert scanned == [source_files[0], source_files[2]]
+
+
+def test_cache_iter_streamed(tmp_path, source_files: Iterable[SourceFile]) -> None:
+    """
+    Test that a sequential parser yields each source file as soon as it is read.
+    """
+    # Given
+    read: List[SourceFile] = []
+
+    def read_source_files() -> Iterator[SourceFile]:
+        for source_file in source_files:
+            read.append(source_file)
+            yield source_file
+
+    # When
+    with DependencyCache(tmp_path) as cache:
+        source_dependencies = CachedParser(PARSER, cache).iter_source_dependencies(
+            read_source_files()
+        )
+        first = next(source_dependencies)
+        read_before_first = len(read)
+        rest = list(source_dependencies)
+
+    # Then
+    assert read_before_first == 1
+    assert [first, *rest] == list(PARSER.iter_source_dependencies(read))
+
+
+def test_check_result_store(tmp_path) -> None:
+    """
+    Test that check results are read back, only for the same rules.
+    """
+    # Given
+    configuration = Configuration({"*": [ModuleWildcard("module%")]})
+    module = Module("amodule")
+    results = {
+        module: ModuleResult(
+            errors=(
+                DependencyError(
+                    module, Module("other"), (ModuleWildcard("module%"),), "amodule.py"
+                ),
+            ),
+            used_rules=((ModuleWildcard("*"), ModuleWildcard("module%")),),
+            path="amodule.py",
+        ),
+        Module("empty"): ModuleResult(),
+    }
+
+    # When
+    with DependencyCache(tmp_path) as cache:
+        result_store = CheckResultStore(cache, configuration, [])
+        assert result_store.read() is None
+        result_store.clear()
+        result_store.update(results, [])
+        partial = result_store.read()
+        result_store.complete()
+        CheckResultStore(cache, configuration, []).update({}, [Module("empty")])
+    with DependencyCache(tmp_path) as cache:
+        stored = CheckResultStore(cache, configuration, []).read()
+        other_stored = CheckResultStore(cache, Configuration(), []).read()
+
+    # Then
+    assert partial is None
+    assert stored == {module: results[module]}
+    assert other_stored is None
+
+
+def test_check_result_store_by_key(tmp_path) -> None:
+    """
+    Test that checks of other rules keep their results, until they are stale.
+    """
+    # Given
+    configuration = Configuration({"*": [ModuleWildcard("module%")]})
+    other_configuration = Configuration({"*": [ModuleWildcard("other%")]})
+    results = {Module("amodule"): ModuleResult(), Module("other"): ModuleResult()}
+
+    # When
+    with DependencyCache(tmp_path) as cache:
+        result_store = CheckResultStore(cache, configuration, [])
+        other_store = CheckResultStore(cache, other_configuration, [])
+        result_store.clear()
+        result_store.update(results, [])
+        other_store.clear()
+        other_store.update(results, [])
+        result_store.complete()
+        other_store.complete()
+        kept = result_store.read()
+        with patch("dep_check.infra.cache._CHECK_RESULTS_LIFETIME", -1):
+            other_store.clear()
+        pruned = result_store.read()
+
+    # Then
+    assert kept == results
+    assert pruned is None
@@ -2,7 +2,8 @@
 Test check use case.
 """
 
-from unittest.mock import Mock
+from typing import Iterator
+from unittest.mock import Mock, call
 
 import pytest
 from ordered_set import OrderedSet
@@ -14,6 +15,8 @@ from dep_check.use_cases.check import (
     DependencyError,
     ForbiddenDepencyError,
     ForbiddenUnusedRuleError,
+    IReporter,
+    MatchingRulesResolver,
 )
 from dep_check.use_cases.interfaces import Configuration, UnusedLevel
 
@@ -435,3 +438,97 @@ def test_passing_inverted_no_unused_rule() -> None:
 
     # Then
     assert not report_printer.print_report.call_args[0][0]
+
+
+def test_rules_resolver_shares_rules() -> None:
+    # Given
+    dep_rules = {
+        "module_(<name>*)": [ModuleWildcard("{name}.submodule")],
+        "module_*": [ModuleWildcard("module%")],
+    }
+    resolver = MatchingRulesResolver(Configuration(dep_rules), PARSER)
+
+    # When
+    toto_rules = resolver.get_rules(Module("module_toto"))
+    tata_rules = resolver.get_rules(Module("module_tata"))
+
+    # Then
+    assert resolver.get_rules(Module("module_toto")) is toto_rules
+    assert resolver.get_compiled_rules(
+        Module("module_toto")
+    ) is resolver.get_compiled_rules(Module("module_toto"))
+    assert [r.specific_rule_wildcard for r in toto_rules] == [
+        ModuleWildcard("toto.submodule"),
+        ModuleWildcard("module%"),
+    ]
+    assert [r.specific_rule_wildcard for r in tata_rules] == [
+        ModuleWildcard("tata.submodule"),
+        ModuleWildcard("module%"),
+    ]
+    assert not resolver.get_rules(Module("other"))
+
+
+def test_streaming_reporter(source_files) -> None:
+    """
+    Test that a streaming reporter is notified of the errors of each file,
+    as soon as it is checked.
+    """
+    # Given
+    configuration = Configuration(
+        dependency_rules={"amodule.*": [ModuleWildcard("module%")]}
+    )
+    reporter = Mock(spec=IReporter)
+    use_case = CheckDependenciesUC(configuration, reporter, PARSER, source_files)
+
+    # When
+    with pytest.raises(ForbiddenDepencyError):
+        use_case.run()
+
+    # Then
+    assert reporter.mock_calls[0] == call.begin()
+    assert reporter.mock_calls[1:5] == [
+        call.on_error(DependencyError(SIMPLE_FILE.module, Module("module"), tuple())),
+        call.on_error(
+            DependencyError(SIMPLE_FILE.module, Module("module.inside.module"), tuple())
+        ),
+        call.on_error(
+            DependencyError(SIMPLE_FILE.module, Module("amodule.aclass"), tuple())
+        ),
+        call.on_file_done(SIMPLE_FILE.module, (), None),
+    ]
+    assert reporter.mock_calls[-1] == call.end(OrderedSet(), 3)
+
+
+@pytest.mark.parametrize("max_errors, nb_files", [(1, 1), (3, 1), (4, 2)])
+def test_max_errors(source_files, max_errors: int, nb_files: int) -> None:
+    """
+    Test that the check stops reading source files once max errors are found.
+    """
+    # Given
+    configuration = Configuration(unused_level=UnusedLevel.ERROR.value)
+    read_files = []
+
+    def iter_source_files() -> Iterator[SourceFile]:
+        for source_file in source_files:
+            read_files.append(source_file)
+            yield source_file
+
+    report_printer = Mock()
+    use_case = CheckDependenciesUC(
+        configuration,
+        report_printer,
+        PARSER,
+        iter_source_files(),
+        max_errors=max_errors,
+    )
+
+    # When
+    with pytest.raises(ForbiddenDepencyError):
+        use_case.run()
+
+    # Then
+    report = report_printer.print_report.call_args[0]
+    assert len(report[0]) == max_errors
+    assert not report[1]
+    assert report[2] == nb_files
+    assert len(read_files) == nb_files
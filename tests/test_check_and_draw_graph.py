@@ -0,0 +1,103 @@
+"""
+Test check and draw graph use case.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from dep_check.infra.python_parser import PythonParser
+from dep_check.models import ModuleWildcard
+from dep_check.use_cases.check import CheckDependenciesUC, ForbiddenDepencyError
+from dep_check.use_cases.check_and_draw_graph import CheckAndDrawGraphUC
+from dep_check.use_cases.draw_graph import DrawGraphUC
+from dep_check.use_cases.interfaces import Configuration
+
+from .fakefile import GLOBAL_DEPENDENCIES, SIMPLE_FILE
+
+
+def test_single_scan(source_files) -> None:
+    """
+    Test that each source file is parsed once for both use cases.
+    """
+    # Given
+    configuration = Configuration(
+        dependency_rules={
+            "*": [ModuleWildcard("module%"), ModuleWildcard("amodule%")],
+        }
+    )
+    parser = PythonParser()
+    report_printer = Mock()
+    drawer = Mock()
+    use_case = CheckAndDrawGraphUC(
+        CheckDependenciesUC(configuration, report_printer, parser, iter([])),
+        DrawGraphUC(drawer, parser, iter([])),
+        parser,
+        source_files,
+    )
+
+    # When
+    with (
+        patch.object(
+            parser, "find_source_dependencies", wraps=parser.find_source_dependencies
+        ) as find_source_dependencies,
+        patch.object(parser, "find_dependencies") as find_dependencies,
+    ):
+        use_case.run()
+
+    # Then
+    assert find_source_dependencies.call_count == 3
+    find_dependencies.assert_not_called()
+    assert report_printer.print_report.call_args[0][0] == []
+    drawer.write.assert_called_with(GLOBAL_DEPENDENCIES)
+
+
+def test_draw_on_check_error() -> None:
+    """
+    Test that the graph is drawn even if the check fails.
+    """
+    # Given
+    parser = PythonParser()
+    report_printer = Mock()
+    drawer = Mock()
+    use_case = CheckAndDrawGraphUC(
+        CheckDependenciesUC(Configuration(), report_printer, parser, iter([])),
+        DrawGraphUC(drawer, parser, iter([])),
+        parser,
+        iter([SIMPLE_FILE]),
+    )
+
+    # When
+    with pytest.raises(ForbiddenDepencyError):
+        use_case.run()
+
+    # Then
+    drawer.write.assert_called_with(
+        {SIMPLE_FILE.module: GLOBAL_DEPENDENCIES[SIMPLE_FILE.module]}
+    )
+
+
+def test_draw_all_on_max_errors(source_files) -> None:
+    """
+    Test that the graph holds all modules, even if the check stops on errors.
+    """
+    # Given
+    parser = PythonParser()
+    report_printer = Mock()
+    drawer = Mock()
+    use_case = CheckAndDrawGraphUC(
+        CheckDependenciesUC(
+            Configuration(), report_printer, parser, iter([]), max_errors=1
+        ),
+        DrawGraphUC(drawer, parser, iter([])),
+        parser,
+        iter(source_files),
+    )
+
+    # When
+    with pytest.raises(ForbiddenDepencyError):
+        use_case.run()
+
+    # Then
+    assert report_printer.print_report.call_args[0][2] == 1
+    drawer.write.assert_called_with(GLOBAL_DEPENDENCIES)
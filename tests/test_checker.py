@@ -6,7 +6,11 @@ from typing import List
 
 from pytest import raises
 
-from dep_check.checker import NotAllowedDependencyException, check_dependency
+from dep_check.checker import (
+    NotAllowedDependencyException,
+    RuleCompiler,
+    check_dependency,
+)
 from dep_check.infra.python_parser import PythonParser
 from dep_check.models import (
     Dependency,
@@ -118,3 +122,56 @@ def test_not_dynamic_rules_case() -> None:
 
     # Then
     assert not error
+
+
+def test_compiled_rules_case() -> None:
+    """
+    Test that compiled rules give the same result as raw rules.
+    """
+    # Given
+    dependency = Dependency(Module("toto"), frozenset((Module("tata"),)))
+    rules: MatchingRules = [
+        MatchingRule(ModuleWildcard("a"), ModuleWildcard("to*"), ModuleWildcard("to*")),
+        MatchingRule(
+            ModuleWildcard("a"),
+            ModuleWildcard("~toto.ti*"),
+            ModuleWildcard("~toto.ti*"),
+        ),
+    ]
+    compiler = RuleCompiler(PARSER)
+
+    # When
+    compiled_rules = compiler.compile(rules)
+    used_rules = check_dependency(PARSER, dependency, compiled_rules)
+
+    # Then
+    assert compiler.compile(rules) is compiled_rules
+    assert used_rules == check_dependency(PARSER, dependency, rules)
+    assert list(used_rules) == rules
+
+
+def test_compiled_rules_not_mergeable_case() -> None:
+    """
+    Test compiled rules whose patterns cannot be merged in a single regex.
+    """
+    # Given
+    dependency = Dependency(Module("toto.tata"))
+    rules: MatchingRules = [
+        MatchingRule(
+            ModuleWildcard("a"),
+            ModuleWildcard("(<name>titi).*"),
+            ModuleWildcard("(<name>titi).*"),
+        ),
+        MatchingRule(
+            ModuleWildcard("a"),
+            ModuleWildcard("(<name>toto).*"),
+            ModuleWildcard("(<name>toto).*"),
+        ),
+    ]
+
+    # When
+    compiled_rules = RuleCompiler(PARSER).compile(rules)
+    used_rules = check_dependency(PARSER, dependency, compiled_rules)
+
+    # Then
+    assert list(used_rules) == rules[1:]
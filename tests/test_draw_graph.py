@@ -2,15 +2,20 @@
 Test graph use case
 """
 
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
 from typing import Iterator
 from unittest.mock import Mock, patch
 
+import pytest
 from ordered_set import OrderedSet
 
-from dep_check.infra.io import Graph, GraphDrawer
+from dep_check.infra.io import Graph, GraphDrawer, GraphRenderError
 from dep_check.infra.python_parser import PythonParser
 from dep_check.models import Dependency, Module, SourceFile
-from dep_check.use_cases.draw_graph import DrawGraphUC, _fold_dep
+from dep_check.use_cases.draw_graph import DrawGraphUC, _ModuleResolver, _rewrite_graph
 
 from .fakefile import GLOBAL_DEPENDENCIES, SIMPLE_FILE
 
@@ -51,20 +56,21 @@ def test_nominal(source_files) -> None:
     assert global_dep == GLOBAL_DEPENDENCIES
 
 
-def test_dot() -> None:
+def test_dot(tmp_path, monkeypatch) -> None:
     """
     Test that the dot file is well generated
     """
     # Given
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
     source_files: Iterator[SourceFile] = iter([SIMPLE_FILE])
-    drawer = GraphDrawer(Graph("tests/graph.svg"))
+    drawer = GraphDrawer(Graph(str(tmp_path / "graph.svg"), keep_dot=True))
     use_case = DrawGraphUC(drawer, PARSER, source_files)
 
     # When
     use_case.run()
 
     # Then
-    with open("/tmp/graph.dot", encoding="utf-8") as dot:
+    with open(str(drawer.graph.dot_file_name), encoding="utf-8") as dot:
         lines = sorted(dot.readlines())
 
     assert lines == sorted(
@@ -82,14 +88,242 @@ def test_dot() -> None:
     )
 
 
+def test_write_dot_twice(tmp_path) -> None:
+    """
+    Test that the dot file is streamed, and only holds the last graph
+    """
+    # Given
+    dot_file = tmp_path / "graph.dot"
+    drawer = GraphDrawer(
+        Graph(str(dot_file), {"layers": {"simple": {"modules": ["simple"]}}})
+    )
+    global_dep = {
+        Module("simple_module"): OrderedSet(
+            [Dependency(Module("module")), Dependency(Module("amodule"))]
+        )
+    }
+
+    # When
+    drawer.write(global_dep)
+    drawer.write(global_dep)
+
+    # Then
+    stream = StringIO()
+    drawer.write_dot(stream, global_dep)
+    assert dot_file.read_text(encoding="utf-8") == stream.getvalue()
+    assert stream.getvalue().endswith(
+        '"simple_module" -> "amodule"\n"simple_module" -> "module"\n}\n'
+    )
+    assert stream.getvalue().count("subgraph cluster_simple {") == 1
+
+
+def test_layers() -> None:
+    """
+    Test that each layer holds the modules starting with one of its prefixes
+    """
+    # Given
+    layers = {
+        "domain": {"modules": ["amodule", "module."]},
+        "infra": {"modules": ["module.inside", "module"]},
+        "empty": {"modules": ["other"]},
+    }
+    drawer = GraphDrawer(Graph("graph.svg", {"layers": layers}))
+
+    # When
+    stream = StringIO()
+    drawer.write_dot(stream, GLOBAL_DEPENDENCIES)
+
+    # Then
+    lines = stream.getvalue().splitlines()
+    assert [lines[i + 2] for i, line in enumerate(lines) if "cluster" in line] == [
+        '"amodule", "amodule.inside", "amodule.local_module"'
+        ', "amodule.std_module", "module.inside.module";',
+        '"module", "module.inside.module";',
+        ";",
+    ]
+
+
+def test_sorted_dot() -> None:
+    """
+    Test that the dot document does not depend on the order of the modules
+    and of their dependencies
+    """
+    # Given
+    drawer = GraphDrawer(Graph("graph.svg"))
+    reversed_dep = {
+        module: OrderedSet(reversed(list(deps)))
+        for module, deps in reversed(list(GLOBAL_DEPENDENCIES.items()))
+    }
+
+    # When
+    stream, reversed_stream = StringIO(), StringIO()
+    drawer.write_dot(stream, GLOBAL_DEPENDENCIES)
+    drawer.write_dot(reversed_stream, reversed_dep)
+
+    # Then
+    assert stream.getvalue() == reversed_stream.getvalue()
+    edges = [line for line in stream.getvalue().splitlines() if " -> " in line]
+    assert edges == sorted(edges)
+
+
+@pytest.fixture(name="fake_engine")
+def fixture_fake_engine(tmp_path) -> str:
+    """
+    A fake graphviz layout engine, writing the dot document it reads as svg.
+    It fails on a "failing" module, and hangs on a "slow" one.
+    """
+    engine = tmp_path / "fake_dot"
+    engine.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        "dot = open(sys.argv[2]) if len(sys.argv) > 2 else sys.stdin\n"
+        "content = dot.read()\n"
+        "sys.stdout.write(content)\n"
+        "time.sleep(10 if 'slow' in content else 0)\n"
+        "sys.exit(3 if 'failing' in content else 0)\n",
+        encoding="utf-8",
+    )
+    engine.chmod(0o755)
+    return str(engine)
+
+
+@pytest.mark.parametrize("keep_dot", [False, True])
+def test_render(tmp_path, fake_engine: Path, keep_dot: bool) -> None:
+    """
+    Test that the dot document is streamed to the layout engine, and its output
+    to the svg file
+    """
+    # Given
+    svg_file = tmp_path / "graph.svg"
+    drawer = GraphDrawer(
+        Graph(str(svg_file), layout_engine=str(fake_engine), keep_dot=keep_dot)
+    )
+
+    # When
+    drawer.write(GLOBAL_DEPENDENCIES)
+
+    # Then
+    stream = StringIO()
+    drawer.write_dot(stream, GLOBAL_DEPENDENCIES)
+    assert svg_file.read_text(encoding="utf-8") == stream.getvalue()
+    if keep_dot:
+        dot_file = Path(str(drawer.graph.dot_file_name))
+        assert dot_file.read_text(encoding="utf-8") == stream.getvalue()
+        dot_file.unlink()
+    else:
+        assert drawer.graph.dot_file_name is None
+
+
+@pytest.mark.parametrize(
+    "module, match",
+    [
+        ("failing", "failed with exit code 3"),
+        ("slow", "timed out after 0.5s"),
+        ("missing engine", "Cannot run graphviz"),
+    ],
+)
+def test_render_error(tmp_path, fake_engine: str, module: str, match: str) -> None:
+    """
+    Test that render errors are raised, without leaving a partial svg file
+    """
+    # Given
+    svg_file = tmp_path / "graph.svg"
+    engine = fake_engine if module != "missing engine" else "missing_engine"
+    drawer = GraphDrawer(Graph(str(svg_file), layout_engine=engine, render_timeout=0.5))
+
+    # When
+    with pytest.raises(GraphRenderError, match=match):
+        drawer.write({Module(module): OrderedSet([Dependency(Module("other"))])})
+
+    # Then
+    assert not svg_file.exists()
+
+
+@pytest.mark.parametrize("render_cache", [True, False])
+def test_render_cache(tmp_path, fake_engine: str, render_cache: bool) -> None:
+    """
+    Test that an unchanged graph is not drawn again, unless the render cache
+    is disabled
+    """
+    # Given
+    svg_file = tmp_path / "graph.svg"
+    drawer = GraphDrawer(
+        Graph(str(svg_file), layout_engine=fake_engine), render_cache=render_cache
+    )
+    drawer.write(GLOBAL_DEPENDENCIES)
+    svg_file.write_text("drawn", encoding="utf-8")
+
+    # When
+    drawer.write(GLOBAL_DEPENDENCIES)
+
+    # Then
+    assert (svg_file.read_text(encoding="utf-8") == "drawn") is render_cache
+    assert Path(f"{svg_file}.hash").exists() is render_cache
+
+
+def test_render_cache_changed(tmp_path, fake_engine: str) -> None:
+    """
+    Test that the graph is drawn again when it, or its layout options, change
+    """
+    # Given
+    svg_file = tmp_path / "graph.svg"
+    drawer = GraphDrawer(Graph(str(svg_file), layout_engine=fake_engine))
+    drawer.write(GLOBAL_DEPENDENCIES)
+    svg_file.write_text("drawn", encoding="utf-8")
+    other_dep = {Module("other"): OrderedSet([Dependency(Module("module"))])}
+
+    # When
+    drawer.write(other_dep)
+
+    # Then
+    assert '"other" -> "module"' in svg_file.read_text(encoding="utf-8")
+
+    # When
+    svg_file.write_text("drawn", encoding="utf-8")
+    drawer.graph.render_timeout = 10
+    drawer.write(other_dep)
+
+    # Then
+    assert svg_file.read_text(encoding="utf-8") == "drawn"
+
+    # When
+    drawer.graph.layout_engine = str(Path(fake_engine).rename(tmp_path / "neato"))
+    drawer.write(other_dep)
+
+    # Then
+    assert '"other" -> "module"' in svg_file.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("module", ["failing", "slow"])
+def test_render_cache_error(tmp_path, fake_engine: str, module: str) -> None:
+    """
+    Test that a graph which failed to render is drawn again
+    """
+    # Given
+    svg_file = tmp_path / "graph.svg"
+    drawer = GraphDrawer(
+        Graph(str(svg_file), layout_engine=fake_engine, render_timeout=0.5)
+    )
+    drawer.write(GLOBAL_DEPENDENCIES)
+    failing_dep = {Module(module): OrderedSet([Dependency(Module("other"))])}
+
+    # When
+    with pytest.raises(GraphRenderError):
+        drawer.write(failing_dep)
+
+    # Then
+    assert not svg_file.exists()
+    assert not Path(f"{svg_file}.hash").exists()
+
+
 @patch.object(GraphDrawer, "_write_svg")
-def test_not_svg_with_dot(mock_method) -> None:
+def test_not_svg_with_dot(mock_method, tmp_path) -> None:
     """
     Test that no svg file is created when .dot in argument
     """
     # Given
     source_files: Iterator[SourceFile] = iter([SIMPLE_FILE])
-    drawer = GraphDrawer(Graph("tests/graph.dot"))
+    drawer = GraphDrawer(Graph(str(tmp_path / "graph.dot")))
     use_case = DrawGraphUC(drawer, PARSER, source_files)
 
     # When
@@ -99,46 +333,43 @@ def test_not_svg_with_dot(mock_method) -> None:
     mock_method.assert_not_called()
 
 
-def test_fold_dep_empty_dict() -> None:
+def test_rewrite_graph_empty_dict() -> None:
     """
-    Test result of _fold_dep function with an empty dictionary
+    Test result of _rewrite_graph function with an empty dictionary
     """
     # Given
-    global_dep = {}
-    fold_module = Module("module")
+    resolver = _ModuleResolver([Module("module")], [])
 
     # When
-    global_dep = _fold_dep(global_dep, fold_module)
+    global_dep = _rewrite_graph({}, resolver)
 
     # Then
-    global_dep = {}
+    assert global_dep == {}
 
 
-def test_fold_dep_empty_module() -> None:
+def test_rewrite_graph_empty_module() -> None:
     """
-    Test result of _fold_dep function with an empty fold module
+    Test result of _rewrite_graph function with an empty fold module
     """
     # Given
-    global_dep = GLOBAL_DEPENDENCIES
-    fold_module = Module("")
+    resolver = _ModuleResolver([Module("")], [])
 
     # When
-    global_dep = _fold_dep(global_dep, fold_module)
+    global_dep = _rewrite_graph(GLOBAL_DEPENDENCIES, resolver)
 
     # Then
-    global_dep = GLOBAL_DEPENDENCIES
+    assert global_dep == GLOBAL_DEPENDENCIES
 
 
-def test_fold_dep() -> None:
+def test_rewrite_graph_fold() -> None:
     """
-    Test result of _fold_dep function with an empty fold module
+    Test result of _rewrite_graph function with a fold module
     """
     # Given
-    global_dep = GLOBAL_DEPENDENCIES
-    fold_module = Module("amodule")
+    resolver = _ModuleResolver([Module("amodule")], [])
 
     # When
-    global_dep = _fold_dep(global_dep, fold_module)
+    global_dep = _rewrite_graph(GLOBAL_DEPENDENCIES, resolver)
 
     # Then
     assert global_dep == {
@@ -153,12 +384,45 @@ def test_fold_dep() -> None:
             (
                 Dependency(Module("module")),
                 Dependency(Module("module.inside.module")),
-                Dependency(Module("amodule")),
             )
         ),
     }
 
 
+def test_rewrite_graph_dotted_boundaries() -> None:
+    """
+    Test that folding or hiding a module only applies to its sub-modules
+    """
+    # Given
+    global_dep = {
+        Module("a.b.c"): OrderedSet(
+            [
+                Dependency(Module("a.bc")),
+                Dependency(Module("a.b")),
+                Dependency(Module("x.y.z"), frozenset([Module("f")])),
+                Dependency(Module("a.b.hidden.d")),
+                Dependency(Module("x.yz")),
+            ]
+        ),
+        Module("a.bc"): OrderedSet([Dependency(Module("a.b.c"))]),
+        Module("a.b.hidden"): OrderedSet([Dependency(Module("x.yz"))]),
+    }
+    resolver = _ModuleResolver(
+        [Module("a.b"), Module("x.y"), Module("x")], [Module("a.b.hidden")]
+    )
+
+    # When
+    global_dep = _rewrite_graph(global_dep, resolver)
+
+    # Then
+    assert global_dep == {
+        Module("a.b"): OrderedSet(
+            [Dependency(Module("a.bc")), Dependency(Module("x"))]
+        ),
+        Module("a.bc"): OrderedSet([Dependency(Module("a.b"))]),
+    }
+
+
 def test_fold_module(source_files) -> None:
     """
     Test result with a set source files and a module to fold.
@@ -189,7 +453,7 @@ def test_fold_module(source_files) -> None:
     }
 
 
-@patch.object(DrawGraphUC, "_hide")
+@patch.object(DrawGraphUC, "_rewrite")
 def test_hide_empty_config(mock_method, source_files) -> None:
     # Given
     drawer = Mock()
@@ -203,7 +467,7 @@ def test_hide_empty_config(mock_method, source_files) -> None:
     mock_method.assert_called_with(GLOBAL_DEPENDENCIES)
 
 
-@patch.object(DrawGraphUC, "_hide")
+@patch.object(DrawGraphUC, "_rewrite")
 def test_hide_empty_dict(mock_method) -> None:
     # Given
     source_files: Iterator[SourceFile] = iter([])
@@ -0,0 +1,302 @@
+"""
+Test source files discovery.
+"""
+
+import os
+import pickle
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from dep_check.infra.file_system import (
+    DEFAULT_EXCLUDES,
+    ExcludePatterns,
+    GitListingError,
+    changed_source_files,
+    git_source_file_iterator,
+    source_file_iterator,
+)
+from dep_check.infra.python_parser import PythonLexerParser, PythonParser
+from dep_check.models import Dependency, Module
+
+
+@pytest.fixture(name="project")
+def fixture_project(tmp_path, monkeypatch) -> Path:
+    """
+    Create a project tree, and make it the working directory.
+    """
+    for path in (
+        "setup.py",
+        "pkg/__init__.py",
+        "pkg/b.py",
+        "pkg/a.py",
+        "pkg/data.txt",
+        "pkg/sub/__init__.py",
+        "pkg/sub/module.py",
+        "pkg/build/generated.py",
+        "pkg/node_modules/lib.py",
+        "docs/conf.py",
+    ):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(f"# {path}\n", encoding="utf-8")
+    (tmp_path / "pkg" / "build.py").write_text("", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_walk_in_order(project: Path, threads: int) -> None:
+    # When
+    source_files = list(
+        source_file_iterator([project / "pkg"], project, threads=threads)
+    )
+
+    # Then
+    assert [source_file.module for source_file in source_files] == [
+        "pkg.__init__",
+        "pkg.a",
+        "pkg.b",
+        "pkg.build",
+        "pkg.build.generated",
+        "pkg.node_modules.lib",
+        "pkg.sub.__init__",
+        "pkg.sub.module",
+    ]
+    assert source_files[1].code == "# pkg/a.py\n"
+
+
+def test_walk_root(project: Path) -> None:
+    # When
+    modules = [s.module for s in source_file_iterator([project], project)]
+
+    # Then
+    assert modules[:2] == ["setup", "docs.conf"]
+    assert len(modules) == 10
+
+
+def test_walk_symlinks(project: Path) -> None:
+    """
+    Test that symlinked directories are not walked, but symlinked files are.
+    """
+    # Given
+    (project / "pkg" / "sub" / "loop").symlink_to("..", target_is_directory=True)
+    (project / "pkg" / "docs").symlink_to(project / "docs", target_is_directory=True)
+    (project / "pkg" / "sub" / "conf.py").symlink_to(project / "docs" / "conf.py")
+
+    # When
+    modules = [s.module for s in source_file_iterator([project / "pkg"], project)]
+
+    # Then
+    assert modules[-3:] == ["pkg.sub.__init__", "pkg.sub.conf", "pkg.sub.module"]
+    assert len(modules) == 9
+
+
+def test_exclude(project: Path) -> None:
+    # Given
+    exclude = ExcludePatterns(["build/", "node_modules", "docs/*.py", "a.py"])
+
+    # When
+    source_files = source_file_iterator(
+        [project, project / "pkg/a.py"], project, exclude
+    )
+
+    # Then
+    assert [source_file.module for source_file in source_files] == [
+        "setup",
+        "pkg.__init__",
+        "pkg.b",
+        "pkg.build",
+        "pkg.sub.__init__",
+        "pkg.sub.module",
+        "pkg.a",
+    ]
+
+
+def test_default_excludes(project: Path) -> None:
+    """
+    Test that tool directories are excluded by default, but not packages which
+    may be named as build directories.
+    """
+    # Given
+    (project / ".venv/lib").mkdir(parents=True)
+    (project / ".venv/lib/site.py").write_text("", encoding="utf-8")
+
+    # When
+    source_files = source_file_iterator(
+        [project], project, ExcludePatterns(DEFAULT_EXCLUDES)
+    )
+
+    # Then
+    modules = [source_file.module for source_file in source_files]
+    assert "pkg.build.generated" in modules
+    assert "pkg.node_modules.lib" not in modules
+    assert not [module for module in modules if module.startswith(".venv")]
+
+
+def test_gitignore(project: Path) -> None:
+    # Given
+    (project / ".gitignore").write_text(
+        "# Generated\nbuild/\n/docs\n*.py\n!__init__.py\n", encoding="utf-8"
+    )
+    (project / "pkg/sub/.gitignore").write_text("!module.py\n", encoding="utf-8")
+
+    # When
+    source_files = source_file_iterator([project / "pkg"], project, gitignore=True)
+
+    # Then
+    assert [source_file.module for source_file in source_files] == [
+        "pkg.__init__",
+        "pkg.sub.__init__",
+        "pkg.sub.module",
+    ]
+
+
+@pytest.fixture(name="git_project")
+def fixture_git_project(project: Path) -> Path:
+    """
+    Track the project files in a git repository, but a few ones.
+    """
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    (project / ".gitignore").write_text("node_modules/\n", encoding="utf-8")
+    subprocess.run(["git", "init", "-q"], cwd=project, check=True)
+    subprocess.run(["git", "add", "."], cwd=project, check=True)
+    (project / "pkg/untracked.py").write_text("", encoding="utf-8")
+    (project / "pkg/b.py").unlink()
+    return project
+
+
+@pytest.mark.parametrize("gitignore", [False, True])
+def test_changed_files_skipped(project: Path, gitignore: bool) -> None:
+    """
+    Test that changed files are skipped as when walking the source dirs,
+    unless given explicitly.
+    """
+    # Given
+    (project / ".gitignore").write_text("*.py\n!__init__.py\n", encoding="utf-8")
+    (project / "pkg/sub/.gitignore").write_text("!module.py\n", encoding="utf-8")
+    exclude = ExcludePatterns([*DEFAULT_EXCLUDES, "build/"])
+    changed_paths = sorted(Path("pkg").rglob("*.py"))
+    generated = Path("pkg/build/generated.py")
+
+    # When
+    changed_files = changed_source_files(
+        changed_paths, [project / "pkg"], project, exclude, gitignore
+    )
+    explicit_files = changed_source_files(
+        [generated], [project / generated], project, exclude, gitignore
+    )
+
+    # Then
+    walked_files = source_file_iterator(
+        [project / "pkg"], project, exclude, gitignore=gitignore
+    )
+    assert sorted(f.module for f in changed_files.source_files) == sorted(
+        f.module for f in walked_files
+    )
+    assert [f.module for f in explicit_files.source_files] == ["pkg.build.generated"]
+
+
+def test_from_git(git_project: Path) -> None:
+    # When
+    git_source_files = list(
+        git_source_file_iterator([git_project / "pkg"], git_project)
+    )
+
+    # Then
+    source_files = source_file_iterator(
+        [git_project / "pkg"],
+        git_project,
+        ExcludePatterns(["node_modules", "untracked.py"]),
+    )
+    assert git_source_files == list(source_files)
+    assert "pkg.b" not in [source_file.module for source_file in git_source_files]
+
+
+def test_from_git_in_order(git_project: Path) -> None:
+    """
+    Test that the source files are listed in the order of the given paths.
+    """
+    # Given
+    files_path = [git_project / "pkg/sub", git_project / "pkg/a.py", git_project]
+
+    # When
+    git_source_files = list(git_source_file_iterator(files_path[:2], git_project))
+    git_modules = [
+        source_file.module
+        for source_file in git_source_file_iterator(files_path, git_project)
+    ]
+
+    # Then
+    assert git_source_files == list(source_file_iterator(files_path[:2], git_project))
+    assert git_modules[:5] == [
+        "pkg.sub.__init__",
+        "pkg.sub.module",
+        "pkg.a",
+        "setup",
+        "docs.conf",
+    ]
+    assert len(git_modules) == len(set(git_modules))
+
+
+def test_from_git_untracked(git_project: Path) -> None:
+    # Given
+    exclude = ExcludePatterns(["build/"])
+
+    # When
+    source_files = git_source_file_iterator(
+        [git_project], git_project, exclude, untracked=True
+    )
+
+    # Then
+    assert [source_file.module for source_file in source_files] == [
+        "setup",
+        "docs.conf",
+        "pkg.__init__",
+        "pkg.a",
+        "pkg.build",
+        "pkg.untracked",
+        "pkg.sub.__init__",
+        "pkg.sub.module",
+    ]
+
+
+def test_from_git_error(project: Path) -> None:
+    # When not in a git repository
+    with pytest.raises(GitListingError):
+        list(git_source_file_iterator([project], project))
+
+
+def test_read_encoded_file(project: Path) -> None:
+    # Given
+    (project / "pkg/a.py").write_bytes(
+        "# -*- coding: latin-1 -*-\nname = 'Café'\nimport os\n".encode("latin-1")
+    )
+
+    # When
+    source_file = next(source_file_iterator([project / "pkg/a.py"], project))
+
+    # Then
+    assert source_file.code.splitlines()[1] == "name = 'Café'"
+    for parser in (PythonParser(), PythonLexerParser()):
+        assert parser.find_dependencies(source_file) == {Dependency(Module("os"))}
+
+
+@pytest.mark.skipif(not Path("/proc/self/fd").is_dir(), reason="Linux only")
+def test_files_closed(project: Path) -> None:
+    """
+    Test that source files are closed once read, even if they are kept.
+    """
+    # Given
+    (project / "pkg/a.py").write_text("import os\n" * 100_000, encoding="utf-8")
+    nb_fds = len(os.listdir("/proc/self/fd"))
+
+    # When
+    source_files = list(source_file_iterator([project / "pkg"], project))
+
+    # Then
+    assert len(os.listdir("/proc/self/fd")) == nb_fds
+    assert source_files[1].content == b"import os\n" * 100_000
+    assert pickle.loads(pickle.dumps(source_files[1])) == source_files[1]
@@ -0,0 +1,265 @@
+"""
+Test incremental check use case.
+"""
+
+from typing import Iterable, Iterator, Optional
+from unittest.mock import Mock
+
+import pytest
+
+from dep_check.infra.python_parser import PythonParser
+from dep_check.models import ChangedSourceFiles, Module, ModuleWildcard, SourceFile
+from dep_check.use_cases.check import (
+    CheckDependenciesUC,
+    ForbiddenDepencyError,
+    ForbiddenUnusedRuleError,
+    IReporter,
+)
+from dep_check.use_cases.incremental_check import (
+    ICheckResultStore,
+    IncrementalCheckUC,
+    ModuleResults,
+)
+from dep_check.use_cases.interfaces import Configuration, UnusedLevel
+
+from .fakefile import FILE_WITH_LOCAL_IMPORT, FILE_WITH_STD_IMPORT, SIMPLE_FILE
+
+PARSER = PythonParser()
+
+CONFIGURATION = Configuration(
+    dependency_rules={
+        "*": [
+            ModuleWildcard("module%"),
+            ModuleWildcard("amodule%"),
+            ModuleWildcard("unused%"),
+        ],
+        FILE_WITH_STD_IMPORT.module: [ModuleWildcard("module.inside.module")],
+    },
+    unused_level=UnusedLevel.ERROR.value,
+)
+
+
+class FakeResultStore(ICheckResultStore):
+    def __init__(self) -> None:
+        self.results: ModuleResults = {}
+        self.completed = False
+
+    def read(self) -> Optional[ModuleResults]:
+        return dict(self.results) if self.completed else None
+
+    def clear(self) -> None:
+        self.results = {}
+        self.completed = False
+
+    def update(self, results: ModuleResults, removed_modules: Iterable[Module]) -> None:
+        for module in removed_modules:
+            self.results.pop(module, None)
+        self.results.update(results)
+
+    def complete(self) -> None:
+        self.completed = True
+
+
+def _create_use_case(
+    result_store: ICheckResultStore,
+    source_files: Iterable[SourceFile],
+    changed_files: Optional[ChangedSourceFiles] = None,
+) -> IncrementalCheckUC:
+    check_use_case = CheckDependenciesUC(
+        CONFIGURATION, Mock(), PARSER, iter(source_files)
+    )
+    return IncrementalCheckUC(check_use_case, result_store, changed_files)
+
+
+def test_full_check_without_results(source_files) -> None:
+    """
+    Test that all source files are checked without any previous result.
+    """
+    # Given
+    result_store = FakeResultStore()
+    use_case = _create_use_case(
+        result_store, source_files, ChangedSourceFiles([SIMPLE_FILE], [])
+    )
+
+    # When
+    with pytest.raises(ForbiddenUnusedRuleError):
+        use_case.run()
+
+    # Then
+    assert result_store.completed
+    assert set(result_store.results) == {f.module for f in source_files}
+
+
+def test_only_check_changed_files(source_files) -> None:
+    """
+    Test that only changed files are checked, and the unused rules come from
+    all modules.
+    """
+    # Given
+    result_store = FakeResultStore()
+    with pytest.raises(ForbiddenUnusedRuleError):
+        _create_use_case(result_store, source_files).run()
+    parser = Mock(wraps=PARSER)
+    use_case = _create_use_case(result_store, [], ChangedSourceFiles([SIMPLE_FILE], []))
+    use_case.check_use_case.parser = parser
+
+    # When
+    with pytest.raises(ForbiddenUnusedRuleError):
+        use_case.run()
+
+    # Then
+    parser.iter_source_dependencies.assert_called_once()
+    report_printer = use_case.check_use_case.report_printer
+    errors, unused, nb_files = report_printer.print_report.call_args[0]
+    assert not errors
+    assert list(unused) == [("*", "unused%")]
+    assert nb_files == 3
+
+
+def test_forget_removed_modules(source_files) -> None:
+    """
+    Test that removed modules no longer count, nor their used rules.
+    """
+    # Given
+    result_store = FakeResultStore()
+    with pytest.raises(ForbiddenUnusedRuleError):
+        _create_use_case(result_store, source_files).run()
+    use_case = _create_use_case(
+        result_store, [], ChangedSourceFiles([], [FILE_WITH_STD_IMPORT.module])
+    )
+
+    # When
+    with pytest.raises(ForbiddenUnusedRuleError):
+        use_case.run()
+
+    # Then
+    report_printer = use_case.check_use_case.report_printer
+    _, unused, nb_files = report_printer.print_report.call_args[0]
+    assert list(unused) == [
+        ("*", "unused%"),
+        (FILE_WITH_STD_IMPORT.module, "module.inside.module"),
+    ]
+    assert nb_files == 2
+    assert result_store.completed
+    assert set(result_store.results) == {
+        SIMPLE_FILE.module,
+        FILE_WITH_LOCAL_IMPORT.module,
+    }
+
+
+def test_no_partial_results(source_files) -> None:
+    """
+    Test that a full check which may stop on errors is not stored.
+    """
+    # Given
+    result_store = FakeResultStore()
+    check_use_case = CheckDependenciesUC(
+        Configuration(), Mock(), PARSER, iter(source_files), max_errors=1
+    )
+    use_case = IncrementalCheckUC(check_use_case, result_store)
+
+    # When
+    with pytest.raises(ForbiddenDepencyError):
+        use_case.run()
+
+    # Then
+    assert not result_store.completed
+
+
+def test_store_all_changed_files_on_max_errors(source_files) -> None:
+    """
+    Test that all changed files are stored, even if their check stops early on
+    errors.
+    """
+    # Given
+    result_store = FakeResultStore()
+    with pytest.raises(ForbiddenUnusedRuleError):
+        _create_use_case(result_store, source_files).run()
+    expected_store = FakeResultStore()
+    with pytest.raises(ForbiddenDepencyError):
+        IncrementalCheckUC(
+            CheckDependenciesUC(Configuration(), Mock(), PARSER, iter(source_files)),
+            expected_store,
+        ).run()
+    check_use_case = CheckDependenciesUC(
+        Configuration(), Mock(), PARSER, iter([]), max_errors=1
+    )
+    use_case = IncrementalCheckUC(
+        check_use_case, result_store, ChangedSourceFiles(source_files, [])
+    )
+
+    # When
+    with pytest.raises(ForbiddenDepencyError):
+        use_case.run()
+
+    # Then
+    errors, _, nb_files = check_use_case.report_printer.print_report.call_args[0]
+    assert len(errors) == 1
+    assert nb_files == 1
+    assert result_store.results == expected_store.results
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_report_as_checked(source_files, incremental: bool) -> None:
+    """
+    Test that each source file is reported as soon as it is checked, and its
+    result stored afterwards.
+    """
+    # Given
+    events = []
+    result_store = FakeResultStore()
+    if incremental:
+        with pytest.raises(ForbiddenUnusedRuleError):
+            _create_use_case(result_store, source_files).run()
+
+    def iter_source_files() -> Iterator[SourceFile]:
+        for source_file in source_files:
+            events.append(("checked", source_file.module))
+            yield source_file
+
+    reporter = Mock(spec=IReporter)
+    reporter.on_file_done.side_effect = lambda module, *_: events.append(
+        ("reported", module)
+    )
+    check_use_case = CheckDependenciesUC(
+        CONFIGURATION, reporter, PARSER, iter_source_files()
+    )
+    changed_files = ChangedSourceFiles(check_use_case.source_files, [])
+    use_case = IncrementalCheckUC(
+        check_use_case, result_store, changed_files if incremental else None
+    )
+
+    # When
+    with pytest.raises(ForbiddenUnusedRuleError):
+        use_case.run()
+
+    # Then
+    assert events == [
+        (event, source_file.module)
+        for source_file in source_files
+        for event in ("checked", "reported")
+    ]
+    assert result_store.completed
+    assert set(result_store.results) == {f.module for f in source_files}
+
+
+def test_no_results_on_failure(source_files) -> None:
+    """
+    Test that the results of an interrupted full check are not read back.
+    """
+    # Given
+    result_store = FakeResultStore()
+    parser = Mock(wraps=PARSER)
+    parser.iter_source_dependencies.side_effect = lambda files: (
+        PARSER.find_source_dependencies(f) if f is not FILE_WITH_STD_IMPORT else 1 / 0
+        for f in files
+    )
+    use_case = _create_use_case(result_store, source_files)
+    use_case.check_use_case.parser = parser
+
+    # When
+    with pytest.raises(ZeroDivisionError):
+        use_case.run()
+
+    # Then
+    assert result_store.read() is None
@@ -2,9 +2,12 @@
 Test functions in models module.
 """
 
+import dataclasses
+import pickle
+
 from pytest import raises
 
-from dep_check.models import Module, get_parent, iter_all_modules
+from dep_check.models import Dependency, Module, get_parent, iter_all_modules
 
 from .fakefile import GLOBAL_DEPENDENCIES
 
@@ -118,3 +121,44 @@ class TestIterAllModules:
                 "amodule.std_module",
             ]
         )
+
+
+class TestDependency:
+    """
+    Test Dependency class.
+    """
+
+    @staticmethod
+    def test_compact() -> None:
+        """
+        Test that module names and empty sub imports are shared.
+        """
+        # Given
+        names = ["".join(("amod", "ule")) for _ in range(2)]
+        assert names[0] is not names[1]
+
+        # When
+        dependencies = [Dependency(Module(name)) for name in names]
+
+        # Then
+        assert dependencies[0].main_import is dependencies[1].main_import
+        assert dependencies[0].sub_imports is dependencies[1].sub_imports
+        assert not hasattr(dependencies[0], "__dict__")
+
+    @staticmethod
+    def test_value() -> None:
+        """
+        Test that dependencies are still frozen values.
+        """
+        # Given
+        dependency = Dependency(Module("amodule"), frozenset((Module("aclass"),)))
+
+        # When
+        copy = pickle.loads(pickle.dumps(dependency))
+
+        # Then
+        assert copy == dependency
+        assert hash(copy) == hash(dependency)
+        assert copy != Dependency(Module("amodule"))
+        with raises(dataclasses.FrozenInstanceError):
+            copy.main_import = Module("other")  # type: ignore[misc]
@@ -2,12 +2,19 @@
 Tests about get_dependencies function.
 """
 
+import gc
 import re
+import weakref
+from typing import Iterator
 
 from ordered_set import OrderedSet
 
-from dep_check.dependency_finder import get_dependencies, get_import_from_dependencies
-from dep_check.infra.python_parser import PythonParser
+from dep_check.dependency_finder import (
+    get_dependencies,
+    get_import_from_dependencies,
+    iter_source_dependencies,
+)
+from dep_check.infra.python_parser import PythonLexerParser, PythonParser
 from dep_check.models import Dependency, Module, ModuleWildcard, SourceCode, SourceFile
 
 _SIMPLE_CASE = """
@@ -50,7 +57,66 @@ _LOCAL_RESULT_IMPORT_FROM = OrderedSet(
     )
 )
 
+_NESTED_CASE = """
+import simple
+
+if TYPE_CHECKING:
+    import typed
+else:
+    try:
+        from tried import aclass
+    except ImportError:
+        import handled
+    finally:
+        import final
+
+
+class AClass:
+    import in_class
+
+    def method(self, value=lambda: None):
+        with context():
+            import in_method
+        match value:
+            case 1:
+                import in_case
+"""
+_NESTED_RESULT = OrderedSet(
+    (
+        Dependency(Module("simple")),
+        Dependency(Module("typed")),
+        Dependency(Module("tried")),
+        Dependency(Module("handled")),
+        Dependency(Module("final")),
+        Dependency(Module("in_class")),
+        Dependency(Module("in_method")),
+        Dependency(Module("in_case")),
+    )
+)
+
+_LEXER_CASE = '''
+"""
+import in_docstring
+"""
+import simple  # import in_comment
+from module import (  # comment
+    aclass,
+    other as alias,
+)
+from . \\
+    import local
+text = f"{value!r:>{width}} import in_fstring"
+'''
+_LEXER_RESULT_IMPORT_FROM = OrderedSet(
+    (
+        Dependency(Module("simple")),
+        Dependency(Module("module"), frozenset((Module("aclass"), Module("other")))),
+        Dependency(Module("module"), frozenset((Module("local"),))),
+    )
+)
+
 PARSER = PythonParser()
+LEXER_PARSER = PythonLexerParser()
 
 
 class TestGetDependencies:
@@ -62,7 +128,7 @@ class TestGetDependencies:
         # Given
         module = Module("")
         source_code = SourceCode("")
-        source_file = SourceFile(module=module, code=source_code)
+        source_file = SourceFile(module=module, content=source_code)
 
         # When
         dependencies = get_dependencies(source_file, PARSER)
@@ -77,7 +143,7 @@ class TestGetDependencies:
         """
         # Given
         module = Module("toto_program")
-        source_file = SourceFile(module=module, code=SourceCode(_SIMPLE_CASE))
+        source_file = SourceFile(module=module, content=SourceCode(_SIMPLE_CASE))
 
         # When
         dependencies = get_dependencies(source_file, PARSER)
@@ -92,7 +158,7 @@ class TestGetDependencies:
         """
         # Given
         module = Module("module.toto")
-        source_file = SourceFile(module=module, code=SourceCode(_LOCAL_CASE))
+        source_file = SourceFile(module=module, content=SourceCode(_LOCAL_CASE))
 
         # When
         dependencies = get_dependencies(source_file, PARSER)
@@ -100,6 +166,21 @@ class TestGetDependencies:
         # Then
         assert dependencies == _LOCAL_RESULT
 
+    @staticmethod
+    def test_nested_import_case() -> None:
+        """
+        Test code with imports nested in statement bodies.
+        """
+        # Given
+        module = Module("toto_program")
+        source_file = SourceFile(module=module, content=SourceCode(_NESTED_CASE))
+
+        # When
+        dependencies = get_dependencies(source_file, PARSER)
+
+        # Then
+        assert list(dependencies) == list(_NESTED_RESULT)
+
 
 class TestGetImportFromDependencies:
     @staticmethod
@@ -110,7 +191,7 @@ class TestGetImportFromDependencies:
         # Given
         module = Module("")
         source_code = SourceCode("")
-        source_file = SourceFile(module=module, code=source_code)
+        source_file = SourceFile(module=module, content=source_code)
 
         # When
         dependencies = get_import_from_dependencies(source_file, PARSER)
@@ -125,7 +206,7 @@ class TestGetImportFromDependencies:
         """
         # Given
         module = Module("toto_program")
-        source_file = SourceFile(module=module, code=SourceCode(_SIMPLE_CASE))
+        source_file = SourceFile(module=module, content=SourceCode(_SIMPLE_CASE))
 
         # When
         dependencies = get_import_from_dependencies(source_file, PARSER)
@@ -140,7 +221,7 @@ class TestGetImportFromDependencies:
         """
         # Given
         module = Module("module.toto")
-        source_file = SourceFile(module=module, code=SourceCode(_LOCAL_CASE))
+        source_file = SourceFile(module=module, content=SourceCode(_LOCAL_CASE))
 
         # When
         dependencies = get_import_from_dependencies(source_file, PARSER)
@@ -154,7 +235,7 @@ class TestGetImportFromDependencies:
         module = Module("module.toto")
         source_file = SourceFile(
             module=module,
-            code=SourceCode("from module import amodule, othermodule, moduleagain"),
+            content=SourceCode("from module import amodule, othermodule, moduleagain"),
         )
 
         # When
@@ -177,6 +258,97 @@ class TestGetImportFromDependencies:
         )
 
 
+class TestLexerParser:
+    @staticmethod
+    def test_lexer_case() -> None:
+        """
+        Test that strings and comments are skipped by the lexer.
+        """
+        # Given
+        module = Module("module.toto")
+        source_file = SourceFile(module=module, content=SourceCode(_LEXER_CASE))
+
+        # When
+        dependencies = get_import_from_dependencies(source_file, LEXER_PARSER)
+
+        # Then
+        assert list(dependencies) == list(_LEXER_RESULT_IMPORT_FROM)
+        assert dependencies == get_import_from_dependencies(source_file, PARSER)
+
+    @staticmethod
+    def test_nested_import_case() -> None:
+        """
+        Test code with imports nested in statement bodies.
+        """
+        # Given
+        module = Module("toto_program")
+        source_file = SourceFile(module=module, content=SourceCode(_NESTED_CASE))
+
+        # When
+        dependencies = get_dependencies(source_file, LEXER_PARSER)
+
+        # Then
+        assert list(dependencies) == list(_NESTED_RESULT)
+
+    @staticmethod
+    def test_ambiguous_case() -> None:
+        """
+        Test that ambiguous code falls back to the whole file parsing.
+        """
+        # Given
+        module = Module("toto_program")
+        source_file = SourceFile(
+            module=module,
+            content=SourceCode(
+                "if TYPE_CHECKING: import typed\nimport simple; import other"
+            ),
+        )
+
+        # When
+        dependencies = get_dependencies(source_file, LEXER_PARSER)
+
+        # Then
+        assert list(dependencies) == [
+            Dependency(Module("typed")),
+            Dependency(Module("simple")),
+            Dependency(Module("other")),
+        ]
+
+
+class TestIterSourceDependencies:
+    """
+    Test iter_source_dependencies function.
+    """
+
+    @staticmethod
+    def test_source_file_released() -> None:
+        """
+        Test that source files are not kept once their dependencies are found.
+        """
+        # Given
+        references = []
+
+        def iter_source_files() -> Iterator[SourceFile]:
+            for i in range(3):
+                source_file = SourceFile(
+                    Module(f"module_{i}"), _SIMPLE_CASE.encode(), f"module_{i}.py"
+                )
+                references.append(weakref.ref(source_file))
+                yield source_file
+
+        # When
+        records = []
+        for record in iter_source_dependencies(iter_source_files(), PARSER):
+            gc.collect()
+            records.append(record)
+
+            # Then
+            assert all(reference() is None for reference in references[:-1])
+        assert records[2].module == "module_2"
+        assert set(records[2].import_from_dependencies) == _SIMPLE_RESULT_IMPORT_FROM
+        assert (records[2].path, records[2].size) == ("module_2.py", 70)
+
+
 class TestRegexToWildcard:
     """
     Test build module regex function.
@@ -0,0 +1,25 @@
+"""
+Test process pool parser.
+"""
+
+from typing import Iterable
+
+from dep_check.infra.process_pool import ProcessPoolParser
+from dep_check.infra.python_parser import PythonParser
+from dep_check.models import SourceFile
+
+PARSER = PythonParser()
+
+
+def test_same_result_in_order(source_files: Iterable[SourceFile]) -> None:
+    # Given
+    many_source_files = list(source_files) * 10
+    pool_parser = ProcessPoolParser(PARSER, jobs=2, chunksize=4)
+
+    # When
+    source_dependencies = list(pool_parser.iter_source_dependencies(many_source_files))
+
+    # Then
+    assert source_dependencies == list(
+        PARSER.iter_source_dependencies(many_source_files)
+    )
@@ -0,0 +1,75 @@
+"""
+Test report printer.
+"""
+
+from ordered_set import OrderedSet
+
+from dep_check.infra.io import ReportPrinter, StreamReportPrinter
+from dep_check.models import Module, ModuleWildcard
+from dep_check.use_cases.check import DependencyError
+from dep_check.use_cases.interfaces import Configuration
+
+_RULES = (ModuleWildcard("amodule%"),)
+
+
+def test_group_errors_by_module(capsys) -> None:
+    # Given
+    errors = [
+        DependencyError(Module("b"), Module("first"), _RULES),
+        DependencyError(Module("a"), Module("second"), _RULES),
+        DependencyError(Module("b"), Module("third"), _RULES),
+    ]
+    printer = ReportPrinter(Configuration())
+
+    # When
+    printer.print_report(errors, OrderedSet(), 2)
+
+    # Then
+    output = capsys.readouterr().out
+    assert output.index("Module \033[1ma") < output.index("second")
+    assert output.index("second") < output.index("Module \033[1mb")
+    assert output.index("Module \033[1mb") < output.index("first")
+    assert output.index("first") < output.index("third")
+    assert output.count("amodule%") == 2
+    assert output.endswith(" in 2 files.\n")
+
+
+def test_many_errors(capsys) -> None:
+    # Given
+    errors = [
+        DependencyError(Module(f"module{i % 1000}"), Module(f"dependency{i}"), _RULES)
+        for i in range(100_000)
+    ]
+    printer = ReportPrinter(Configuration())
+
+    # When
+    printer.print_report(errors, OrderedSet(), 1000)
+
+    # Then
+    output = capsys.readouterr().out
+    assert output.count("\t- dependency") == 100_000
+    assert output.count("\nModule ") == 1000
+
+
+def test_stream_errors_by_file(capsys) -> None:
+    # Given
+    printer = StreamReportPrinter(Configuration())
+    printer.begin()
+
+    # When
+    printer.on_error(DependencyError(Module("b"), Module("first"), _RULES))
+    printer.on_file_done(Module("b"), ())
+    printer.on_file_done(Module("c"), ())
+    first_output = capsys.readouterr().out
+    printer.on_error(DependencyError(Module("a"), Module("second"), _RULES))
+    printer.on_file_done(Module("a"), ())
+    printer.end(OrderedSet(), 3)
+
+    # Then
+    output = capsys.readouterr().out
+    assert "IMPORT ERRORS" in first_output
+    assert "first" in first_output
+    assert "IMPORT ERRORS" not in output
+    assert "second" in output
+    assert "2 errors" in output
+    assert output.endswith(" in 3 files.\n")
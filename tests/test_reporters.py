@@ -0,0 +1,124 @@
+"""
+Test machine-readable reporters.
+"""
+
+import io
+import json
+from typing import Iterable, List
+from xml.etree import ElementTree
+
+import pytest
+
+from dep_check.infra.python_parser import PythonParser
+from dep_check.infra.reporters import JsonLinesReporter, JUnitReporter, SarifReporter
+from dep_check.models import ModuleWildcard, SourceFile
+from dep_check.use_cases.check import CheckDependenciesUC, ForbiddenDepencyError
+from dep_check.use_cases.interfaces import Configuration, UnusedLevel
+
+from .fakefile import FILE_WITH_LOCAL_IMPORT, SIMPLE_FILE
+
+PARSER = PythonParser()
+
+CONFIGURATION = Configuration(
+    dependency_rules={
+        "*": [ModuleWildcard("module%")],
+        "amodule.*": [ModuleWildcard("amodule%"), ModuleWildcard("unused")],
+    },
+    unused_level=UnusedLevel.ERROR.value,
+)
+
+
+def _with_paths(source_files: Iterable[SourceFile]) -> List[SourceFile]:
+    return [
+        SourceFile(f.module, f.content, f"src/{f.module.replace('.', '/')}.py")
+        for f in source_files
+    ]
+
+
+def _check(reporter_class, source_files) -> str:
+    stream = io.StringIO()
+    use_case = CheckDependenciesUC(
+        CONFIGURATION,
+        reporter_class(CONFIGURATION, stream, "dependency_config.yaml"),
+        PARSER,
+        _with_paths(source_files),
+    )
+    with pytest.raises(ForbiddenDepencyError):
+        use_case.run()
+    return stream.getvalue()
+
+
+def test_json_lines(source_files) -> None:
+    # When
+    records = [
+        json.loads(line)
+        for line in _check(JsonLinesReporter, source_files).split("\n")
+        if line
+    ]
+
+    # Then
+    assert records[0] == {
+        "type": "error",
+        "module": SIMPLE_FILE.module,
+        "dependency": "amodule.aclass",
+        "rules": ["module%"],
+    }
+    files = [r for r in records if r["type"] == "file"]
+    assert [r["module"] for r in files] == [f.module for f in source_files]
+    assert [r["path"] for r in files] == [f.path for f in _with_paths(source_files)]
+    assert files[1]["used_rules"] == [["*", "module%"], ["amodule.*", "amodule%"]]
+    assert all(r["duration"] >= 0 for r in files)
+    assert [r for r in records if r["type"] == "unused_rule"] == [
+        {"type": "unused_rule", "level": "error", "rule": ["amodule.*", "unused"]}
+    ]
+    assert records[-1]["type"] == "summary"
+    assert records[-1]["nb_files"] == 3
+    assert records[-1]["nb_errors"] == 1
+
+
+def test_sarif(source_files) -> None:
+    # When
+    sarif = json.loads(_check(SarifReporter, source_files))
+
+    # Then
+    run = sarif["runs"][0]
+    assert sarif["version"] == "2.1.0"
+    assert [(r["ruleId"], r["level"]) for r in run["results"]] == [
+        ("forbidden-import", "error"),
+        ("unused-rule", "error"),
+    ]
+    location = run["results"][0]["locations"][0]
+    assert location["logicalLocations"][0]["fullyQualifiedName"] == SIMPLE_FILE.module
+    assert location["physicalLocation"]["artifactLocation"] == {
+        "uri": "src/simple_module.py"
+    }
+    unused_location = run["results"][1]["locations"][0]["physicalLocation"]
+    assert unused_location["artifactLocation"] == {"uri": "dependency_config.yaml"}
+    assert [f["module"] for f in run["properties"]["files"]] == [
+        f.module for f in source_files
+    ]
+
+
+def test_junit(source_files) -> None:
+    # When
+    root = ElementTree.fromstring(_check(JUnitReporter, source_files))
+
+    # Then
+    test_cases = root.findall("./testsuite/testcase")
+    assert [t.get("name") for t in test_cases] == [
+        *(f.module for f in source_files),
+        "unused rules",
+    ]
+    assert [t.find("failure") is not None for t in test_cases] == [
+        True,
+        False,
+        False,
+        True,
+    ]
+    assert "amodule.aclass" in test_cases[0].find("failure").text
+    assert "amodule%" in test_cases[1].find("system-out").text
+    assert FILE_WITH_LOCAL_IMPORT.module == test_cases[1].get("name")
+    assert [t.get("file") for t in test_cases] == [
+        *(f.path for f in _with_paths(source_files)),
+        "dependency_config.yaml",
+    ]
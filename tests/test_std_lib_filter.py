@@ -0,0 +1,39 @@
+"""
+Test standard library filter.
+"""
+
+from ordered_set import OrderedSet
+
+from dep_check.infra.std_lib_filter import StdLibSimpleFilter
+from dep_check.models import Dependency, Module
+
+
+def test_filter_top_level_name() -> None:
+    # Given
+    dependencies = OrderedSet(
+        Dependency(Module(module))
+        for module in ("os", "os.path", "osmnx", "re", "requests", "abc", "abcd.os")
+    )
+
+    # When
+    filtered = StdLibSimpleFilter().filter(dependencies)
+
+    # Then
+    assert list(filtered) == [
+        Dependency(Module("osmnx")),
+        Dependency(Module("requests")),
+        Dependency(Module("abcd.os")),
+    ]
+
+
+def test_filter_given_modules() -> None:
+    # Given
+    dependencies = OrderedSet(
+        Dependency(Module(module)) for module in ("os", "mystdlib.sub", "requests")
+    )
+
+    # When
+    filtered = StdLibSimpleFilter({"mystdlib"}).filter(dependencies)
+
+    # Then
+    assert list(filtered) == [Dependency(Module("os")), Dependency(Module("requests"))]
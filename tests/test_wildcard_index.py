@@ -0,0 +1,86 @@
+"""
+Test wildcard index.
+"""
+
+import re
+
+from dep_check.infra.python_parser import PythonParser
+from dep_check.models import Module, ModuleWildcard
+from dep_check.wildcard_index import WildcardIndex
+
+PARSER = PythonParser()
+
+_WILDCARDS = [
+    ModuleWildcard(wildcard)
+    for wildcard in (
+        "toto",
+        "toto.tata",
+        "toto%",
+        "toto.tata%",
+        "toto*",
+        "toto.*",
+        "toto.ta*",
+        "~toto.tata%",
+        "*",
+        "%",
+        "",
+        "t?to.tata",
+        "toto.[!t]*",
+        "(<name>*).tata",
+    )
+]
+
+_MODULES = [
+    Module(module)
+    for module in (
+        "",
+        "toto",
+        "totos",
+        "toto.tata",
+        "toto.tata.titi",
+        "toto.tatas",
+        "toto.titi",
+        "tutu",
+        "tutu.tata",
+        ".toto",
+    )
+]
+
+
+def test_empty() -> None:
+    # Given
+    index = WildcardIndex(PARSER, [])
+
+    # When
+    matches = index.match(Module("toto"))
+
+    # Then
+    assert not matches
+
+
+def test_same_result_as_regex() -> None:
+    # Given
+    index = WildcardIndex(PARSER, _WILDCARDS)
+
+    for module in _MODULES:
+        # When
+        matches = index.match(module)
+
+        # Then
+        expected = []
+        for i, wildcard in enumerate(_WILDCARDS):
+            match = re.match(f"{PARSER.wildcard_to_regex(wildcard).regex}$", module)
+            if match:
+                expected.append((i, tuple(match.groupdict().items())))
+        assert matches == expected, module
+
+
+def test_named_groups() -> None:
+    # Given
+    index = WildcardIndex(PARSER, [ModuleWildcard("module_(<name>*)")])
+
+    # When
+    matches = index.match(Module("module_toto"))
+
+    # Then
+    assert matches == [(0, (("name", "toto"),))]